@@ -0,0 +1,286 @@
+# ------------------------------------------------------
+# This module defines the model backends behind ai_service.
+# The OpenAI backend calls the real API; the local backend is
+# a deterministic offline stand-in that returns schema-valid
+# JSON for every operation, with configurable latency and
+# injected failures, so the pipeline can be load-tested
+# without API keys or costs. AI_BACKEND selects one.
+# ------------------------------------------------------
+
+import os
+import re
+import json
+import random
+import asyncio
+import hashlib
+import httpx
+from abc import ABC, abstractmethod
+from openai import AsyncOpenAI, RateLimitError
+from dotenv import load_dotenv
+from prompt_builder import count_message_tokens, count_tokens
+
+load_dotenv()
+
+# Which backend serves AI calls: "openai" or "local"
+AI_BACKEND = os.getenv("AI_BACKEND", "openai").lower()
+
+# Local backend behaviour
+AI_LOCAL_LATENCY_MS = float(os.getenv("AI_LOCAL_LATENCY_MS", "200"))
+AI_LOCAL_LATENCY_JITTER_MS = float(os.getenv("AI_LOCAL_LATENCY_JITTER_MS", "50"))
+AI_LOCAL_TOKENS_PER_SECOND = float(os.getenv("AI_LOCAL_TOKENS_PER_SECOND", "100"))
+AI_LOCAL_FAILURE_RATE = float(os.getenv("AI_LOCAL_FAILURE_RATE", "0"))
+AI_LOCAL_RATE_LIMIT_RATE = float(os.getenv("AI_LOCAL_RATE_LIMIT_RATE", "0"))
+AI_LOCAL_RETRY_AFTER_SECONDS = float(os.getenv("AI_LOCAL_RETRY_AFTER_SECONDS", "1"))
+AI_LOCAL_SEED = int(os.getenv("AI_LOCAL_SEED", "0"))
+
+
+class Usage:
+    """Token usage of one completion (same fields as the OpenAI usage object)."""
+
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+
+class Completion:
+    """Text of a finished completion plus its token usage (if known)."""
+
+    def __init__(self, text: str, usage: Usage = None):
+        self.text = text
+        self.usage = usage
+
+
+class ModelBackend(ABC):
+    """
+    Interface of a model backend. `complete` returns a Completion;
+    `stream` returns an async iterator of text deltas once the request
+    has been accepted (so rate-limit errors surface before streaming).
+    With json_mode=True the reply must be a single JSON object.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def complete(self, operation: str, model: str, messages: list, json_mode: bool = False) -> Completion:
+        ...
+
+    @abstractmethod
+    async def stream(self, operation: str, model: str, messages: list, json_mode: bool = False):
+        ...
+
+
+class OpenAIBackend(ModelBackend):
+    """Chat completions from the OpenAI API."""
+
+    name = "openai"
+
+    def __init__(self, api_key: str = None):
+        # Retries are left to ai_rate_limiter, which honors Retry-After for every caller
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    async def complete(self, operation: str, model: str, messages: list, json_mode: bool = False) -> Completion:
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.3,
+            **self._format(json_mode)
+        )
+        return Completion(response.choices[0].message.content, response.usage)
+
+    async def stream(self, operation: str, model: str, messages: list, json_mode: bool = False):
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.3,
+            stream=True,
+            **self._format(json_mode)
+        )
+        return self._deltas(response)
+
+    def _format(self, json_mode: bool) -> dict:
+        return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    async def _deltas(self, response):
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class LocalBackendError(Exception):
+    """Failure injected by the local backend."""
+
+
+def _section(text: str, start: str, end: str = "\n\n"):
+    """Text between `start` and the next `end` in a prompt (None if absent)."""
+    begin = text.find(start)
+    if begin < 0:
+        return None
+    begin += len(start)
+    stop = text.find(end, begin)
+    return text[begin:stop if stop >= 0 else len(text)].strip()
+
+
+def _json_section(text: str, start: str, default):
+    """Parse the JSON written after `start` in a prompt."""
+    try:
+        return json.loads(_section(text, start, "\n"))
+    except (TypeError, ValueError):
+        return default
+
+
+def _local_rfp(prompt: str, rng: random.Random) -> dict:
+    """RFPCreate-shaped reply built from the user's request text."""
+    request = _section(prompt, "User request:") or ""
+    budget = re.search(r"\$\s?([\d,]+(?:\.\d+)?)", request)
+    days = re.search(r"(\d+)\s*days?", request, re.IGNORECASE)
+    items = [
+        {"name": name.strip(), "quantity": int(quantity), "specifications": ""}
+        for quantity, name in re.findall(
+            r"\b(\d+)\s+([A-Za-z][A-Za-z\- ]{2,40}?)(?=\s+(?:with|and|for)\b|[,.;]|$)", request
+        )
+    ] or [{"name": "Item 1", "quantity": rng.randint(1, 50), "specifications": ""}]
+
+    return {
+        "title": " ".join(request.split()[:8]) or "Local RFP",
+        "description": request,
+        "budget": float(budget.group(1).replace(",", "")) if budget else float(rng.randint(10, 500) * 100),
+        "delivery_days": int(days.group(1)) if days else rng.randint(7, 60),
+        "payment_terms": "Net 30",
+        "warranty_required": "1 year",
+        "items": items,
+        "requirements": []
+    }
+
+
+def _local_proposal(prompt: str, rng: random.Random) -> dict:
+    """ProposalBase-shaped reply quoting every RFP item in the prompt."""
+    rfp_items = _json_section(prompt, "Items:", [])
+    items = []
+    for index, item in enumerate(rfp_items if isinstance(rfp_items, list) else []):
+        if not isinstance(item, dict) or "name" not in item:
+            continue
+        quantity = item.get("quantity") if isinstance(item.get("quantity"), (int, float)) else 1
+        unit_price = float(rng.randint(20, 2000))
+        items.append({
+            "name": item["name"],
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_price": round(unit_price * quantity, 2),
+            "specifications": item.get("specifications", "")
+        })
+
+    return {
+        "total_price": round(sum(item["total_price"] for item in items), 2) or float(rng.randint(10, 500) * 100),
+        "delivery_days": rng.randint(5, 60),
+        "payment_terms": rng.choice(["Net 30", "Net 45", "50% upfront"]),
+        "warranty": rng.choice(["1 year", "2 years", "6 months"]),
+        "items": items,
+        "terms_conditions": "Prices valid for 30 days.",
+        "completeness_score": round(rng.uniform(0.6, 1.0), 2)
+    }
+
+
+def _local_narrative(prompt: str, rng: random.Random) -> dict:
+    """Narrative reply (strengths/weaknesses, reason, summary) for the scored vendors."""
+    scores = _json_section(prompt, "Scores and ranks (already computed, do not change them):\n", [])
+    recommended = _section(prompt, "Recommended vendor:") or "the top vendor"
+    comparison = [
+        {
+            "vendor_name": entry.get("vendor_name"),
+            "strengths": [f"Overall score {entry.get('score')}"],
+            "weaknesses": [] if entry.get("price_rank") == 1 else [f"Price rank {entry.get('price_rank')}"]
+        }
+        for entry in (scores if isinstance(scores, list) else [])
+        if isinstance(entry, dict)
+    ]
+    return {
+        "comparison": comparison,
+        "recommendation": {
+            "reason": f"{recommended} offers the best balance of price and delivery.",
+            "summary": f"{len(comparison)} proposals compared."
+        }
+    }
+
+
+# Reply builder for each ai_service operation
+_LOCAL_REPLIES = {
+    "parse_rfp": _local_rfp,
+    "extract_proposal": _local_proposal,
+    "comparison_narrative": _local_narrative
+}
+
+
+class LocalBackend(ModelBackend):
+    """
+    Deterministic offline stand-in: the same prompt always gets the
+    same reply. Latency, errors and 429s are drawn from a seeded RNG.
+    """
+
+    name = "local"
+
+    def __init__(self, latency_ms: float = AI_LOCAL_LATENCY_MS, jitter_ms: float = AI_LOCAL_LATENCY_JITTER_MS,
+                 tokens_per_second: float = AI_LOCAL_TOKENS_PER_SECOND, failure_rate: float = AI_LOCAL_FAILURE_RATE,
+                 rate_limit_rate: float = AI_LOCAL_RATE_LIMIT_RATE, seed: int = AI_LOCAL_SEED):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+
+    async def complete(self, operation: str, model: str, messages: list, json_mode: bool = False) -> Completion:
+        text = await self._reply(operation, messages)
+        return Completion(text, self._usage(model, messages, text))
+
+    async def stream(self, operation: str, model: str, messages: list, json_mode: bool = False):
+        text = await self._reply(operation, messages)
+        return self._deltas(text)
+
+    async def _deltas(self, text: str):
+        # Roughly 4 characters per token, paced at tokens_per_second
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for start in range(0, len(text), 4):
+            await asyncio.sleep(delay)
+            yield text[start:start + 4]
+
+    async def _reply(self, operation: str, messages: list) -> str:
+        """Wait the simulated latency, inject failures, then build the reply."""
+        delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(delay, 0) / 1000)
+
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise RateLimitError(
+                "Local backend rate limit",
+                response=httpx.Response(
+                    429,
+                    headers={"retry-after": str(AI_LOCAL_RETRY_AFTER_SECONDS)},
+                    request=httpx.Request("POST", "http://local-backend/chat/completions")
+                ),
+                body=None
+            )
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise LocalBackendError(f"Injected failure in {operation}")
+
+        # Content depends only on the prompt, never on call order
+        prompt = "\n".join(message["content"] for message in messages)
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16], 16)
+        build = _LOCAL_REPLIES.get(operation, lambda _prompt, _rng: {})
+        return json.dumps(build(messages[-1]["content"], random.Random(seed)))
+
+    def _usage(self, model: str, messages: list, text: str) -> Usage:
+        return Usage(count_message_tokens(messages, model), count_tokens(text, model))
+
+
+def create_backend(name: str) -> ModelBackend:
+    """Backend for an AI_BACKEND value; raises ValueError for unknown names."""
+    if name == "openai":
+        return OpenAIBackend(api_key=os.getenv("OPENAI_API_KEY"))
+    if name == "local":
+        return LocalBackend()
+    raise ValueError(f"Unknown AI_BACKEND: {name} (expected 'openai' or 'local')")
+
+
+# Shared backend used by ai_service
+ai_backend = create_backend(AI_BACKEND)
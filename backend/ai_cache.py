@@ -0,0 +1,210 @@
+# ------------------------------------------------------
+# This module provides a content-addressed cache for AI results.
+# Identical (operation, model, inputs) combinations are hashed
+# into a key so repeated parses, extractions and comparisons are
+# answered locally instead of paying for another model call.
+# Entries live in an in-memory LRU backed by a small SQLite file;
+# file reads and writes run in a worker thread so they never
+# block the event loop.
+# ------------------------------------------------------
+
+import os
+import json
+import time
+import copy
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache configuration loaded from environment variables
+# (set AI_CACHE_PATH to an empty string to keep the cache in memory only)
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "./ai_cache.db")
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000"))
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def _normalize(value):
+    """
+    Normalize prompt inputs so cosmetic differences (line endings,
+    trailing spaces) do not produce different cache keys.
+    """
+    if isinstance(value, str):
+        lines = value.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        return "\n".join(line.rstrip() for line in lines).strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_cache_key(operation: str, model: str, *inputs) -> str:
+    """
+    Build a stable SHA-256 key from the operation name, model name
+    and the normalized prompt inputs.
+    """
+    payload = json.dumps(
+        [operation, model, [_normalize(i) for i in inputs]],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AICache:
+    """
+    LRU + TTL cache for AI results with a hard size cap.
+    Hot entries are served from memory; the SQLite file keeps
+    results across restarts.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (expires_at, value), ordered from least to most recently used
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Serializes use of the SQLite connection across worker threads
+        self._db_lock = threading.Lock()
+
+        # Hit/miss counters exposed through stats()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            # WAL + synchronous=NORMAL: commits do not fsync
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            # Eviction walks entries by last_access
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_cache_last_access ON ai_cache (last_access)")
+            self._conn.commit()
+
+    async def get(self, key: str):
+        """Return a copy of the cached value, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(value)
+                # Expired — drop it everywhere
+                del self._memory[key]
+
+        # Fall back to the persistent store (also drops the expired row)
+        row = None
+        if self._conn is not None:
+            row = await asyncio.to_thread(self._load_persisted, key, now)
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            expires_at, value = row
+            self._remember(key, expires_at, value)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    async def set(self, key: str, value) -> None:
+        """Store a JSON-serializable value under the given key."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, copy.deepcopy(value))
+
+        if self._conn is not None:
+            evicted = await asyncio.to_thread(self._store_persisted, key, json.dumps(value), expires_at, now)
+            with self._lock:
+                self.evictions += evicted
+
+    def clear(self) -> None:
+        """Remove every cached entry and reset counters."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                with self._db_lock:
+                    self._conn.execute("DELETE FROM ai_cache")
+                    self._conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+    def _remember(self, key: str, expires_at: float, value) -> None:
+        """Insert into the in-memory LRU and evict beyond the size cap."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            if self._conn is None:
+                self.evictions += 1
+
+    def _load_persisted(self, key: str, now: float):
+        """(expires_at, value) of a live persisted entry, or None. Runs in a worker thread."""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[1], json.loads(row[0])
+
+    def _store_persisted(self, key: str, value_json: str, expires_at: float, now: float) -> int:
+        """Write an entry and trim the file; returns rows evicted. Runs in a worker thread."""
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value_json, expires_at, now)
+            )
+            # Drop expired rows and anything beyond the size cap (least recently used first)
+            self._conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (now,))
+            cursor = self._conn.execute(
+                "DELETE FROM ai_cache WHERE key IN ("
+                " SELECT key FROM ai_cache ORDER BY last_access"
+                " LIMIT MAX((SELECT COUNT(*) FROM ai_cache) - ?, 0))",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+            return max(cursor.rowcount, 0)
+
+
+# Shared cache instance used by ai_service
+ai_result_cache = AICache(AI_CACHE_PATH, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL_SECONDS)
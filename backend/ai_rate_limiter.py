@@ -0,0 +1,217 @@
+# ------------------------------------------------------
+# This module throttles calls to the OpenAI API on the client
+# side. Token buckets keep us under the organization's
+# requests-per-minute and tokens-per-minute limits, a priority
+# queue lets interactive requests go ahead of batch work, and
+# 429 responses are retried after the server's Retry-After.
+# ------------------------------------------------------
+
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from openai import RateLimitError
+
+load_dotenv()
+
+# Organization limits and local concurrency cap
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "30000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+# Tokens reserved for the completion until the real usage is known
+OPENAI_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("OPENAI_COMPLETION_TOKEN_ESTIMATE", "500"))
+
+# Retries for 429 responses (exponential backoff unless the server sends Retry-After)
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+OPENAI_RETRY_BASE_SECONDS = float(os.getenv("OPENAI_RETRY_BASE_SECONDS", "1"))
+OPENAI_RETRY_MAX_SECONDS = float(os.getenv("OPENAI_RETRY_MAX_SECONDS", "60"))
+
+# Request priorities (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# Priority of AI calls made in the current request/task
+_current_priority = ContextVar("ai_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def ai_priority(priority: int):
+    """Run the AI calls made inside this block at the given priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """Bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self.refill()
+        missing = amount - self.level
+        return max(missing / self._rate, 0.0) if self._rate > 0 else float("inf")
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+def _retry_after_seconds(error: RateLimitError):
+    """Delay requested by the server (Retry-After / retry-after-ms headers), if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class AIRateLimiter:
+    """
+    Grants API calls in priority order (FIFO within a priority) once
+    the request bucket, the token bucket and a concurrency slot allow it.
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_concurrency: int):
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._max_concurrency = max_concurrency
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._waiters = []
+        self._order = itertools.count()
+        self._timer = None
+
+        # Counters for /api/metrics
+        self.calls = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    async def call(self, make_request, tokens: int, hold: bool = False):
+        """
+        Run `make_request()` within the limits, retrying 429 responses.
+        With hold=True the concurrency slot stays taken after success
+        (for streams) and the caller must call release() when done.
+        """
+        for attempt in range(OPENAI_MAX_RETRIES + 1):
+            reserved = await self.acquire(tokens)
+            try:
+                response = await make_request()
+            except RateLimitError as e:
+                self.release()
+                self.rate_limited += 1
+                if attempt == OPENAI_MAX_RETRIES:
+                    raise
+                self.retries += 1
+                delay = _retry_after_seconds(e)
+                if delay is None:
+                    delay = min(OPENAI_RETRY_BASE_SECONDS * (2 ** attempt), OPENAI_RETRY_MAX_SECONDS)
+                    delay *= random.uniform(0.5, 1.0)
+                # Everyone waits: the limit applies to the whole organization
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                continue
+            except BaseException:
+                self.release()
+                raise
+
+            # Replace the estimate with the usage the API reports
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None) is not None:
+                self._tokens.give_back(reserved - usage.total_tokens)
+            if not hold:
+                self.release()
+            return response
+
+    async def acquire(self, tokens: int, priority: int = None) -> int:
+        """Wait for a slot at the given (or current) priority; returns the tokens reserved."""
+        priority = _current_priority.get() if priority is None else priority
+        tokens = min(tokens, int(self._tokens.capacity))
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), tokens, waiter))
+        self._pump()
+        if not waiter.done():
+            self.throttled += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Hand the slot back if it was granted as we were cancelled
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        self.calls += 1
+        return tokens
+
+    def release(self) -> None:
+        """Free a concurrency slot."""
+        self._in_flight -= 1
+        self._pump()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "queued": sum(1 for *_, waiter in self._waiters if not waiter.done()),
+            "in_flight": self._in_flight
+        }
+
+    def _pump(self) -> None:
+        """Grant waiting calls in priority order while the limits allow."""
+        while self._waiters:
+            _, _, tokens, waiter = self._waiters[0]
+            if waiter.done():
+                # Cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self._max_concurrency:
+                return
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self._requests.seconds_until(1),
+                self._tokens.seconds_until(tokens)
+            )
+            if wait > 0:
+                self._schedule(wait)
+                return
+
+            heapq.heappop(self._waiters)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+
+
+# Shared limiter for every OpenAI call
+ai_rate_limiter = AIRateLimiter(OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, OPENAI_MAX_CONCURRENCY)
@@ -1,25 +1,135 @@
 # ------------------------------------------------------
 # This module handles all AI-related logic for the system.
-# It uses OpenAI models to parse natural text into RFPs,
-# extract structured proposal data, and compare proposals.
+# It uses language models (through ai_backends) to parse natural
+# text into RFPs, extract structured proposal data, and describe
+# proposal comparisons (scores themselves are computed in scoring.py).
 # ------------------------------------------------------
 
 import os
-import json
-from openai import OpenAI
+import time
+import logging
 from dotenv import load_dotenv
+from ai_backends import ai_backend
+from ai_cache import ai_result_cache, make_cache_key
+from single_flight import ai_single_flight, FlightAbandoned
+from prompt_builder import (
+    AI_PROMPT_TOKEN_BUDGET, PROPOSAL_ITEM_FIELDS, compact_json, count_message_tokens,
+    fit_items, log_prompt, log_usage
+)
+from ai_rate_limiter import ai_rate_limiter, OPENAI_COMPLETION_TOKEN_ESTIMATE
+from structured_output import (
+    AI_JSON_REPAIR_ATTEMPTS, RFPParseOutput, ProposalExtractionOutput, ComparisonNarrativeOutput,
+    parse_json_object, repair_prompt, schema_json, supports_json_mode, validate_fields
+)
+from extraction_router import (
+    AI_MODEL_EXTRACT_PROPOSAL_SMALL, EXTRACTION_TIERS, extraction_tier_stats, heuristic_extract, is_confident
+)
 
 load_dotenv()
 
-# Initialize OpenAI client using API key from environment
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
 
+# Model used by each operation (also part of the cache key)
+RFP_PARSE_MODEL = os.getenv("AI_MODEL_PARSE_RFP", "gpt-4o")
+PROPOSAL_EXTRACT_MODEL = os.getenv("AI_MODEL_EXTRACT_PROPOSAL", "gpt-4")
+PROPOSAL_COMPARE_MODEL = os.getenv("AI_MODEL_COMPARISON_NARRATIVE", "gpt-4")
 
-def parse_natural_language_to_rfp(user_input: str) -> dict:
+# Model behind each model tier of proposal extraction
+EXTRACTION_TIER_MODELS = {"small": AI_MODEL_EXTRACT_PROPOSAL_SMALL, "large": PROPOSAL_EXTRACT_MODEL}
+
+# Tier route as cache-key "model": a different route may extract differently
+EXTRACTION_ROUTE = ">".join(EXTRACTION_TIER_MODELS.get(tier, tier) for tier in EXTRACTION_TIERS)
+
+
+def _cache_key(operation: str, model: str, *inputs) -> str:
+    """AI cache key; results of non-OpenAI backends are kept apart from real ones."""
+    if ai_backend.name != "openai":
+        model = f"{ai_backend.name}:{model}"
+    return make_cache_key(operation, model, *inputs)
+
+
+async def _complete(operation: str, model: str, messages: list) -> str:
+    """Run a chat completion within the API rate limits and return its text."""
+    prompt_tokens = log_prompt(operation, model, messages)
+    completion = await ai_rate_limiter.call(
+        lambda: ai_backend.complete(operation, model, messages, json_mode=supports_json_mode(model)),
+        prompt_tokens + OPENAI_COMPLETION_TOKEN_ESTIMATE
+    )
+    log_usage(operation, model, completion)
+    return completion.text
+
+
+async def _stream_completion(operation: str, model: str, messages: list):
+    """Yield the text deltas of a streamed chat completion as they arrive."""
+    prompt_tokens = log_prompt(operation, model, messages)
+
+    # The concurrency slot is held until the stream is fully read
+    deltas = await ai_rate_limiter.call(
+        lambda: ai_backend.stream(operation, model, messages, json_mode=supports_json_mode(model)),
+        prompt_tokens + OPENAI_COMPLETION_TOKEN_ESTIMATE,
+        hold=True
+    )
+    try:
+        async for delta in deltas:
+            yield delta
+    finally:
+        ai_rate_limiter.release()
+
+
+async def _validated_output(operation: str, model: str, messages: list, content: str, output_model) -> dict:
     """
-    Convert a natural language RFP description into a fully structured RFP.
-    Used when users describe their requirements in plain English.
+    Parse and validate a JSON reply field by field. Invalid or missing
+    fields are re-requested on their own (up to AI_JSON_REPAIR_ATTEMPTS
+    times); optional fields that stay invalid are dropped. ValueError is
+    raised for invalid required fields or when no valid field is left.
     """
+    try:
+        valid, errors = validate_fields(parse_json_object(content), output_model)
+    except ValueError as e:
+        valid, errors = {}, {name: f"not returned ({e})" for name in output_model.model_fields}
+
+    for _ in range(AI_JSON_REPAIR_ATTEMPTS):
+        if not errors:
+            break
+        repair_messages = messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": repair_prompt(errors, output_model)}
+        ]
+        content = await _complete(f"{operation}_repair", model, repair_messages)
+        try:
+            fixed, errors = validate_fields(parse_json_object(content), output_model, fields=errors)
+        except ValueError:
+            continue
+        valid.update(fixed)
+
+    required = [name for name in errors if output_model.model_fields[name].is_required()]
+    if not valid:
+        raise ValueError(f"No valid fields in model reply: {errors}")
+    if required:
+        raise ValueError(f"Invalid {', '.join(required)} in model reply: {errors}")
+    if errors:
+        logger.warning("AI %s dropped invalid fields: %s", operation, errors)
+    return valid
+
+
+async def _wait_for_flight(cache_key: str):
+    """
+    Result of an identical call or stream already in flight, or None if
+    there is none. The caller must then start its own flight right away.
+    """
+    while True:
+        pending = ai_single_flight.join(cache_key)
+        if pending is None:
+            return None
+        try:
+            return await pending
+        except FlightAbandoned:
+            # That stream's client went away before it finished: look again
+            continue
+
+
+def _rfp_parse_messages(user_input: str) -> list:
+    """Chat messages asking the model to turn a request into RFP fields."""
 
     # Prompt instructs model to extract all RFP fields in strict JSON format
     prompt = f"""You are an AI assistant that helps convert procurement requests into structured RFPs.
@@ -38,54 +148,104 @@ Extract the following information and return it as a JSON object:
 
 Return ONLY valid JSON, no additional text."""
 
-    try:
-        # Send structured extraction request to OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You extract structured data and always return valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
-        
-        # Get raw content returned by the model
-        content = response.choices[0].message.content.strip()
+    return [
+        {
+            "role": "system",
+            "content": f"You extract structured data and always return valid JSON matching this schema: {schema_json(RFPParseOutput)}"
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+
+async def parse_natural_language_to_rfp(user_input: str) -> dict:
+    """
+    Convert a natural language RFP description into a fully structured RFP.
+    Used when users describe their requirements in plain English.
+    """
 
-        # Clean possible JSON code block wrappers
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
+    # Serve repeated requests from the cache
+    cache_key = _cache_key("parse_rfp", RFP_PARSE_MODEL, user_input)
+    cached = await ai_result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Identical requests already in flight share one model call
+    async def call():
+        try:
+            # Send structured extraction request to the model
+            messages = _rfp_parse_messages(user_input)
+            content = await _complete("parse_rfp", RFP_PARSE_MODEL, messages)
+
+            # Validate the JSON reply, re-requesting only invalid fields
+            result = await _validated_output("parse_rfp", RFP_PARSE_MODEL, messages, content, RFPParseOutput)
+            await ai_result_cache.set(cache_key, result)
+            return result
+
+        except Exception as e:
+            # Wrap any failure as a readable exception
+            raise Exception(f"Failed to parse RFP: {str(e)}")
+
+    return await ai_single_flight.run(cache_key, call)
+
+
+async def stream_natural_language_to_rfp(user_input: str):
+    """
+    Streaming variant of parse_natural_language_to_rfp.
+    Yields ("token", text) while the model writes, then ("result", dict).
+    """
+    cache_key = _cache_key("parse_rfp", RFP_PARSE_MODEL, user_input)
+    cached = await ai_result_cache.get(cache_key)
+    if cached is not None:
+        yield "result", cached
+        return
+
+    # The same input is already being parsed (blocking or streamed): wait for it
+    pending = await _wait_for_flight(cache_key)
+    if pending is not None:
+        yield "result", pending
+        return
+
+    # Register this stream so identical requests wait for its result
+    flight = ai_single_flight.start(cache_key)
+    try:
+        parts = []
+        messages = _rfp_parse_messages(user_input)
+        async for delta in _stream_completion("parse_rfp", RFP_PARSE_MODEL, messages):
+            parts.append(delta)
+            yield "token", delta
 
-        # Convert clean JSON string to Python dict
-        return json.loads(content)
+        result = await _validated_output("parse_rfp", RFP_PARSE_MODEL, messages, "".join(parts), RFPParseOutput)
+        await ai_result_cache.set(cache_key, result)
+        ai_single_flight.finish(flight, result)
+        yield "result", result
 
     except Exception as e:
-        # Wrap any failure as a readable exception
-        raise Exception(f"Failed to parse RFP: {str(e)}")
+        error = Exception(f"Failed to parse RFP: {str(e)}")
+        ai_single_flight.fail(flight, error)
+        raise error
+    finally:
+        ai_single_flight.fail(flight, FlightAbandoned())
 
 
-def extract_proposal_details(email_content: str, rfp_data: dict) -> dict:
+def _extraction_messages(email_content: str, rfp_data: dict, model: str = PROPOSAL_EXTRACT_MODEL) -> list:
     """
-    Extract structured proposal information from a vendor's email.
-    Uses AI to understand pricing, delivery, warranty, item details, etc.
+    Chat messages asking the model to extract a proposal from an email.
+    RFP items are sent as compact JSON, cut down to fit the prompt budget.
     """
 
-    # Build a summary of RFP requirements to give AI context
-    rfp_summary = f"""
+    def build(items_json: str) -> list:
+        # Build a summary of RFP requirements to give AI context
+        rfp_summary = f"""
 RFP Title: {rfp_data.get('title', 'N/A')}
 Budget: {rfp_data.get('budget', 'N/A')}
 Delivery Required: {rfp_data.get('delivery_days', 'N/A')} days
 Payment Terms Required: {rfp_data.get('payment_terms', 'N/A')}
 Warranty Required: {rfp_data.get('warranty_required', 'N/A')}
-Items: {json.dumps(rfp_data.get('items', []), indent=2)}
+Items: {items_json}
 """
 
-    # AI extraction prompt to interpret vendor email into structured fields
-    prompt = f"""You are an AI assistant that extracts proposal details from vendor email responses.
+        # AI extraction prompt to interpret vendor email into structured fields
+        prompt = f"""You are an AI assistant that extracts proposal details from vendor email responses.
 
 RFP Requirements:
 {rfp_summary}
@@ -104,45 +264,93 @@ Extract the following information and return it as JSON:
 
 Return ONLY valid JSON, no additional text."""
 
-    try:
-        # Call OpenAI for extraction
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "Extract structured data and return JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
+        return [
+            {
+                "role": "system",
+                "content": f"Extract structured data and return JSON only, matching this schema: {schema_json(ProposalExtractionOutput)}"
+            },
+            {"role": "user", "content": prompt}
+        ]
 
-        # Clean returned content
-        content = response.choices[0].message.content.strip()
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
+    # Whatever the rest of the prompt leaves over goes to the item list
+    items_budget = AI_PROMPT_TOKEN_BUDGET - count_message_tokens(build("[]"), model)
+    items = fit_items(rfp_data.get('items', []), max(items_budget, 0), model)
+    return build(compact_json(items))
 
-        return json.loads(content)
 
-    except Exception as e:
-        raise Exception(f"Failed to extract proposal details: {str(e)}")
+async def _run_extraction_tier(tier: str, email_content: str, rfp_data: dict):
+    """Extract a proposal with one tier: regex heuristics or a model."""
+    if tier == "heuristic":
+        return heuristic_extract(email_content, rfp_data)
+    model = EXTRACTION_TIER_MODELS[tier]
+    messages = _extraction_messages(email_content, rfp_data, model)
+    content = await _complete("extract_proposal", model, messages)
+    return await _validated_output("extract_proposal", model, messages, content, ProposalExtractionOutput)
 
 
-def compare_proposals_and_recommend(rfp_data: dict, proposals: list) -> dict:
+async def _route_extraction(email_content: str, rfp_data: dict):
     """
-    Analyze all proposals for an RFP and generate:
-    - vendor comparison scores
-    - strengths/weaknesses
-    - rankings
-    - recommended vendor with reasoning
+    Try the extraction tiers cheapest first and stop at the first
+    confident result. Returns (result, confident). If no tier is
+    confident the last successful result is returned, unless a model
+    tier failed: then the error is raised rather than falling back to
+    a guess (e.g. a heuristic result during a model outage).
     """
+    result, error = None, None
+    for tier in EXTRACTION_TIERS:
+        started = time.monotonic()
+        try:
+            candidate = await _run_extraction_tier(tier, email_content, rfp_data)
+        except Exception as e:
+            extraction_tier_stats.record(tier, time.monotonic() - started, "error")
+            error = e
+            continue
+
+        # Regex results must also price every RFP item to be trusted
+        confident = is_confident(candidate, rfp_data if tier == "heuristic" else None)
+        extraction_tier_stats.record(tier, time.monotonic() - started, "accepted" if confident else "escalated")
+        if isinstance(candidate, dict):
+            result = candidate
+        if confident:
+            return candidate, True
+
+    if error is not None or result is None:
+        raise error or ValueError("No extraction tier returned a JSON object")
+    return result, False
+
+
+async def extract_proposal_details(email_content: str, rfp_data: dict) -> dict:
+    """
+    Extract structured proposal information from a vendor's email.
+    Uses regex heuristics and AI models (see extraction_router) to
+    understand pricing, delivery, warranty, item details, etc.
+    """
+
+    # Identical (email body, RFP) pairs reuse the earlier extraction
+    cache_key = _cache_key("extract_proposal", EXTRACTION_ROUTE, email_content, rfp_data)
+    cached = await ai_result_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    # Convert proposals to simplified summaries for the AI
-    proposals_summary = []
-    for prop in proposals:
-        proposals_summary.append({
+    # Identical extractions already in flight share one extraction
+    async def call():
+        try:
+            result, confident = await _route_extraction(email_content, rfp_data)
+            # Unconfident results are used once but not reused from the cache
+            if confident:
+                await ai_result_cache.set(cache_key, result)
+            return result
+
+        except Exception as e:
+            raise Exception(f"Failed to extract proposal details: {str(e)}")
+
+    return await ai_single_flight.run(cache_key, call)
+
+
+def _summarize_proposals(proposals: list) -> list:
+    """Convert proposals to simplified summaries for the AI."""
+    return [
+        {
             "vendor_name": prop.get("vendor_name", "Unknown"),
             "total_price": prop.get("total_price"),
             "delivery_days": prop.get("delivery_days"),
@@ -150,10 +358,25 @@ def compare_proposals_and_recommend(rfp_data: dict, proposals: list) -> dict:
             "warranty": prop.get("warranty"),
             "completeness_score": prop.get("completeness_score", 0),
             "items": prop.get("items", [])
-        })
+        }
+        for prop in proposals
+    ]
+
+
+def _narrative_messages(rfp_data: dict, proposals_summary: list, scored: dict) -> list:
+    """
+    Chat messages asking for wording around an already scored comparison.
+    Proposal items are reduced to pricing fields and cut down so the
+    prompt fits the token budget.
+    """
+    scores_summary = [
+        {key: comp[key] for key in ("vendor_name", "score", "price_rank", "delivery_rank")}
+        for comp in scored["comparison"]
+    ]
 
-    # Prompt instructing AI to compare proposals and output detailed JSON
-    prompt = f"""You are an AI assistant that helps procurement managers compare vendor proposals.
+    def build(proposals_context: list) -> list:
+        # Prompt asks only for wording; the numbers are already decided
+        prompt = f"""You are an AI assistant that helps procurement managers compare vendor proposals.
 
 RFP Requirements:
 Title: {rfp_data.get('title', 'N/A')}
@@ -163,35 +386,139 @@ Payment Terms Required: {rfp_data.get('payment_terms', 'N/A')}
 Warranty Required: {rfp_data.get('warranty_required', 'N/A')}
 
 Proposals:
-{json.dumps(proposals_summary, indent=2)}
+{compact_json(proposals_context)}
+
+Scores and ranks (already computed, do not change them):
+{compact_json(scores_summary)}
+
+Recommended vendor: {scored['recommendation']['recommended_vendor']}
 
 Return a JSON object with:
-- comparison (scores, strengths, weaknesses, ranks)
-- recommendation (best vendor and explanation)
+- comparison (list of vendor_name, strengths, weaknesses)
+- recommendation (reason and summary explaining the recommended vendor)
 
 Return JSON ONLY."""
 
-    try:
-        # Call OpenAI to perform comparison
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "Compare proposals and output valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
+        return [
+            {
+                "role": "system",
+                "content": f"Describe proposals and output valid JSON only, matching this schema: {schema_json(ComparisonNarrativeOutput)}"
+            },
+            {"role": "user", "content": prompt}
+        ]
+
+    # Measure the prompt without items, then share what is left between proposals
+    without_items = [
+        {key: value for key, value in prop.items() if key != "items" and value is not None}
+        for prop in proposals_summary
+    ]
+    items_budget = AI_PROMPT_TOKEN_BUDGET - count_message_tokens(build(without_items), PROPOSAL_COMPARE_MODEL)
+    per_proposal = max(items_budget, 0) // max(len(proposals_summary), 1)
+    return build([
+        {**summary, "items": fit_items(prop.get("items"), per_proposal, PROPOSAL_COMPARE_MODEL, PROPOSAL_ITEM_FIELDS)}
+        for summary, prop in zip(without_items, proposals_summary)
+    ])
+
+
+def _merge_narrative(scored: dict, narrative: dict) -> dict:
+    """
+    Merge AI wording into the scored result; anything missing keeps
+    the rule-based text.
+    """
+    by_vendor = {
+        entry.get("vendor_name"): entry
+        for entry in narrative.get("comparison", [])
+        if isinstance(entry, dict)
+    }
+    return {
+        "comparison": [
+            {
+                **comp,
+                "strengths": by_vendor.get(comp["vendor_name"], {}).get("strengths") or comp["strengths"],
+                "weaknesses": by_vendor.get(comp["vendor_name"], {}).get("weaknesses") or comp["weaknesses"]
+            }
+            for comp in scored["comparison"]
+        ],
+        "recommendation": {
+            "recommended_vendor": scored["recommendation"]["recommended_vendor"],
+            "reason": narrative.get("recommendation", {}).get("reason") or scored["recommendation"]["reason"],
+            "summary": narrative.get("recommendation", {}).get("summary") or scored["recommendation"]["summary"]
+        }
+    }
+
+
+async def write_comparison_narrative(rfp_data: dict, proposals: list, scored: dict) -> dict:
+    """
+    Add AI-written strengths/weaknesses and recommendation wording to
+    a locally scored comparison (see scoring.score_proposals).
+    Scores, ranks and the recommended vendor are kept as computed.
+    """
+    proposals_summary = _summarize_proposals(proposals)
+
+    # Same RFP, proposal set and scores → same narrative
+    cache_key = _cache_key("comparison_narrative", PROPOSAL_COMPARE_MODEL, rfp_data, proposals_summary, scored)
+    cached = await ai_result_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-        # Clean JSON result
-        content = response.choices[0].message.content.strip()
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
+    # Identical comparisons already in flight share one model call
+    async def call():
+        try:
+            # Call the model for the narrative
+            messages = _narrative_messages(rfp_data, proposals_summary, scored)
+            content = await _complete("comparison_narrative", PROPOSAL_COMPARE_MODEL, messages)
 
-        return json.loads(content)
+            narrative = await _validated_output(
+                "comparison_narrative", PROPOSAL_COMPARE_MODEL, messages, content, ComparisonNarrativeOutput
+            )
+            result = _merge_narrative(scored, narrative)
+            await ai_result_cache.set(cache_key, result)
+            return result
+
+        except Exception as e:
+            raise Exception(f"Failed to write comparison narrative: {str(e)}")
+
+    return await ai_single_flight.run(cache_key, call)
+
+
+async def stream_comparison_narrative(rfp_data: dict, proposals: list, scored: dict):
+    """
+    Streaming variant of write_comparison_narrative.
+    Yields ("token", text) while the model writes, then ("result", dict).
+    """
+    proposals_summary = _summarize_proposals(proposals)
+    cache_key = _cache_key("comparison_narrative", PROPOSAL_COMPARE_MODEL, rfp_data, proposals_summary, scored)
+    cached = await ai_result_cache.get(cache_key)
+    if cached is not None:
+        yield "result", cached
+        return
+
+    # The same narrative is already being written (blocking or streamed): wait for it
+    pending = await _wait_for_flight(cache_key)
+    if pending is not None:
+        yield "result", pending
+        return
+
+    # Register this stream so identical requests wait for its result
+    flight = ai_single_flight.start(cache_key)
+    try:
+        parts = []
+        messages = _narrative_messages(rfp_data, proposals_summary, scored)
+        async for delta in _stream_completion("comparison_narrative", PROPOSAL_COMPARE_MODEL, messages):
+            parts.append(delta)
+            yield "token", delta
+
+        narrative = await _validated_output(
+            "comparison_narrative", PROPOSAL_COMPARE_MODEL, messages, "".join(parts), ComparisonNarrativeOutput
+        )
+        result = _merge_narrative(scored, narrative)
+        await ai_result_cache.set(cache_key, result)
+        ai_single_flight.finish(flight, result)
+        yield "result", result
 
     except Exception as e:
-        raise Exception(f"Failed to compare proposals: {str(e)}")
+        error = Exception(f"Failed to write comparison narrative: {str(e)}")
+        ai_single_flight.fail(flight, error)
+        raise error
+    finally:
+        ai_single_flight.fail(flight, FlightAbandoned())
@@ -0,0 +1,116 @@
+# ------------------------------------------------------
+# Benchmark: API throughput and event-loop lag under concurrent
+# database load. Runs the app in-process (httpx ASGITransport)
+# on a temporary SQLite file and issues a mix of RFP reads and
+# updates at several concurrency levels. Event-loop lag is how
+# late a 10 ms timer fires while the load runs; blocking database
+# calls on the loop show up here.
+#
+#   python bench/db_load.py --requests 2000 --write-ratio 0.2
+# ------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+# The app reads its configuration at import time
+_tmp_dir = tempfile.mkdtemp(prefix="rfp-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}")
+os.environ.update({"AI_BACKEND": "local", "AI_CACHE_PATH": "", "INBOX_SOURCE": ""})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import main  # noqa: E402
+
+
+async def measure_lag(stop: asyncio.Event, samples: list, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def run_level(client, rfp_ids: list, concurrency: int, requests: int, write_ratio: float, rng) -> dict:
+    queue = list(range(requests))
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while queue:
+            queue.pop()
+            rfp_id = rng.choice(rfp_ids)
+            roll = rng.random()
+            if roll < write_ratio:
+                response = await client.put(f"/api/rfps/{rfp_id}", json={"description": f"Revision {rng.random()}"})
+            elif roll < write_ratio + (1 - write_ratio) / 2:
+                response = await client.get(f"/api/rfps/{rfp_id}")
+            else:
+                response = await client.get("/api/rfps/", params={"limit": 20})
+            if response.status_code != 200:
+                failures += 1
+
+    stop, lag = asyncio.Event(), []
+    ticker = asyncio.create_task(measure_lag(stop, lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    lag.sort()
+    return {
+        "concurrency": concurrency,
+        "requests_per_second": round(requests / elapsed, 1),
+        "failures": failures,
+        "lag_p50_ms": round(1000 * lag[len(lag) // 2], 2) if lag else 0.0,
+        "lag_max_ms": round(1000 * lag[-1], 2) if lag else 0.0
+    }
+
+
+async def run(args) -> list:
+    rng = random.Random(args.seed)
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            rfp_ids = []
+            for index in range(args.rfps):
+                response = await client.post("/api/rfps/", json={
+                    "title": f"RFP {index}", "budget": 1000 * (index + 1),
+                    "items": [{"name": "Laptop", "quantity": index + 1}]
+                })
+                rfp_ids.append(response.json()["id"])
+
+            return [
+                await run_level(client, rfp_ids, int(level), args.requests, args.write_ratio, rng)
+                for level in args.levels.split(",")
+            ]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="API throughput and event-loop lag under database load")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--levels", default="1,10,50")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--rfps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print one JSON result per line")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+    print(f"{'concurrency':>11} {'req/s':>8} {'failures':>8} {'lag p50 ms':>10} {'lag max ms':>10}")
+    for result in results:
+        print(f"{result['concurrency']:>11} {result['requests_per_second']:>8} {result['failures']:>8} "
+              f"{result['lag_p50_ms']:>10} {result['lag_max_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main_cli()
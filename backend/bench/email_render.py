@@ -0,0 +1,73 @@
+# ------------------------------------------------------
+# Benchmark: cost of building RFP emails per recipient for
+# RFPs with many items. Compares rendering the RFP for every
+# vendor with rendering it once (RFPEmailTemplate) and only
+# building each vendor's MIME message.
+#
+#   python bench/email_render.py --vendors 200 --items 10,100,500
+# ------------------------------------------------------
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_templates import RFPEmailTemplate  # noqa: E402
+
+
+def rfp_with_items(count: int) -> dict:
+    return {
+        "title": "Office equipment",
+        "description": "Annual hardware refresh",
+        "budget": 250000,
+        "delivery_days": 30,
+        "payment_terms": "Net 30",
+        "warranty_required": "1 year",
+        "items": [
+            {"name": f"Item {index}", "quantity": index + 1, "specifications": {"color": "black", "size": f"{index} cm"}}
+            for index in range(count)
+        ],
+        "requirements": ["Free delivery", "On-site installation"]
+    }
+
+
+def per_vendor_render(rfp_data: dict, vendors: list) -> None:
+    for name, email in vendors:
+        RFPEmailTemplate(rfp_data).build_message("procurement@example.com", email, name).as_string()
+
+
+def render_once(rfp_data: dict, vendors: list) -> None:
+    template = RFPEmailTemplate(rfp_data)
+    for name, email in vendors:
+        template.build_message("procurement@example.com", email, name).as_string()
+
+
+def best_of(function, *args, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-recipient RFP email build cost")
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--items", default="10,100,500")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    vendors = [(f"Vendor {index}", f"vendor{index}@example.com") for index in range(args.vendors)]
+    print(f"{'items':>6} {'per-vendor ms':>14} {'render-once ms':>15} {'speedup':>8}")
+    for count in (int(count) for count in args.items.split(",")):
+        rfp_data = rfp_with_items(count)
+        slow = best_of(per_vendor_render, rfp_data, vendors, repeat=args.repeat) / len(vendors) * 1000
+        fast = best_of(render_once, rfp_data, vendors, repeat=args.repeat) / len(vendors) * 1000
+        print(f"{count:>6} {slow:>14.3f} {fast:>15.3f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
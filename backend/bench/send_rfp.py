@@ -0,0 +1,98 @@
+# ------------------------------------------------------
+# Benchmark: sending one RFP to many vendors through the SMTP
+# pool, against a local aiosmtpd server that takes a fixed time
+# per message (standing in for a real provider's latency).
+# Prints wall time, messages per second and SMTP sessions
+# opened at several send concurrency levels.
+#
+#   python bench/send_rfp.py --vendors 100 --latency-ms 50
+# ------------------------------------------------------
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+import argparse
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class SlowHandler:
+    """Accepts every message after `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_level(vendors: list, rfp_data: dict, concurrency: int, pool_size: int) -> dict:
+    import email_service
+    pool = email_service.SMTPConnectionPool(
+        pool_size, email_service.SMTP_MAX_MESSAGES_PER_CONNECTION, email_service.SMTP_HEALTHCHECK_IDLE_SECONDS
+    )
+    email_service.smtp_pool = pool
+    try:
+        started = time.perf_counter()
+        results = await email_service.send_rfp_to_vendors(vendors, rfp_data, concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+    finally:
+        await pool.close()
+    sent = sum(1 for result in results if result["status"] == "sent")
+    return {"seconds": elapsed, "sent": sent, "connections": pool.stats()["connections_opened"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send one RFP to many vendors through the SMTP pool")
+    parser.add_argument("--vendors", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--levels", default="1,5,10,20")
+    args = parser.parse_args()
+
+    # aiosmtpd warns about its own deprecated API on every login
+    logging.getLogger("mail.log").setLevel(logging.ERROR)
+    controller = Controller(
+        SlowHandler(args.latency_ms / 1000), hostname="127.0.0.1", port=free_port(),
+        authenticator=lambda server, session, envelope, mechanism, auth_data: AuthResult(success=True),
+        auth_require_tls=False
+    )
+    controller.start()
+
+    # email_service reads its SMTP settings at import time
+    os.environ.update({
+        "SMTP_HOST": controller.hostname,
+        "SMTP_PORT": str(controller.port),
+        "SMTP_USER": "bench@example.com",
+        "SMTP_PASSWORD": "bench",
+        "SMTP_USE_TLS": "false"
+    })
+
+    vendors = [{"id": index, "name": f"Vendor {index}", "email": f"vendor{index}@example.com"} for index in range(args.vendors)]
+    rfp_data = {"title": "Laptops", "budget": 50000, "items": [{"name": "Laptop", "quantity": 20}]}
+
+    try:
+        print(f"{'concurrency':>11} {'seconds':>8} {'msg/s':>8} {'sent':>5} {'sessions':>8}")
+        for level in (int(level) for level in args.levels.split(",")):
+            result = asyncio.run(run_level(vendors, rfp_data, level, args.pool_size))
+            print(f"{level:>11} {result['seconds']:>8.2f} {result['sent'] / result['seconds']:>8.1f} "
+                  f"{result['sent']:>5} {result['connections']:>8}")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# ------------------------------------------------------
+# Benchmark: mixed read/write throughput with the SQLite
+# production profile (WAL, synchronous=NORMAL, mmap, large page
+# cache) versus SQLite's defaults. Each profile runs
+# bench/db_load.py in its own process, since the PRAGMAs are
+# read from the environment when the app is imported.
+#
+#   python bench/sqlite_profile.py --requests 2000 --write-ratio 0.5
+# ------------------------------------------------------
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+PROFILES = {
+    "production": {
+        "SQLITE_JOURNAL_MODE": "WAL",
+        "SQLITE_SYNCHRONOUS": "NORMAL",
+        "SQLITE_MMAP_SIZE": str(256 * 1024 * 1024),
+        "SQLITE_CACHE_SIZE": "-65536"
+    },
+    "defaults": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000"
+    }
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite profile on vs off under mixed load")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--levels", default="1,10,50")
+    parser.add_argument("--write-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db_load.py")
+    print(f"{'profile':>10} {'concurrency':>11} {'req/s':>8} {'failures':>8} {'lag max ms':>10}")
+    for name, settings in PROFILES.items():
+        env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+        env.update(settings)
+        output = subprocess.run(
+            [sys.executable, script, "--json", "--requests", str(args.requests),
+             "--levels", args.levels, "--write-ratio", str(args.write_ratio)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        for line in output.splitlines():
+            result = json.loads(line)
+            print(f"{name:>10} {result['concurrency']:>11} {result['requests_per_second']:>8} "
+                  f"{result['failures']:>8} {result['lag_max_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,125 @@
 # ------------------------------------------------------
 # This module initializes the database connection, ORM models,
-# and session handling using SQLAlchemy. Defines Vendor, RFP,
-# and Proposal tables with relationships between them.
+# and session handling using SQLAlchemy's asyncio extension
+# (aiosqlite for SQLite, asyncpg for Postgres). Defines Vendor,
+# RFP, and Proposal tables with relationships between them,
+# plus their normalized line items.
 # ------------------------------------------------------
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean, JSON
+from sqlalchemy import event, Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from db_pool import MeteredQueuePool
 
 load_dotenv()
 
 # Load database URL (fallback to local SQLite database)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./rfp_management.db")
 
-# Create SQLAlchemy engine; special handling for SQLite threading
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# SQLite production profile, applied to every new connection.
+# WAL lets readers run while a write is in progress; synchronous=NORMAL
+# only fsyncs at checkpoints instead of on every commit.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # Negative = KiB (64 MiB)
 
-# Session factory for DB operations
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool for Postgres and file-based SQLite (each SQLite engine gets its own pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+
+def to_async_url(url: str) -> str:
+    """
+    Map a plain database URL onto its async driver
+    (sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg).
+    URLs that already name a driver are returned unchanged.
+    """
+    scheme, sep, rest = url.partition("://")
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+def _pool_options(url: str) -> dict:
+    """
+    Pool settings for create_async_engine. Server databases and file-based
+    SQLite get a metered queue pool, so connections (and for SQLite the
+    connect-time PRAGMAs, page cache and mmap) are kept between requests.
+    In-memory SQLite keeps SQLAlchemy's default.
+    """
+    if url.startswith("sqlite"):
+        if not _is_file_sqlite(url):
+            return {}
+        # A local file needs neither pre-ping nor recycling
+        return {
+            "poolclass": MeteredQueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT
+        }
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING
+    }
+
+
+def _is_file_sqlite(url: str) -> bool:
+    """True for SQLite databases stored in a file (not :memory:)."""
+    scheme, _, rest = url.partition("://")
+    path = rest.lstrip("/")
+    return scheme.startswith("sqlite") and bool(path) and not path.startswith(":memory:")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool = False) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+# Create async SQLAlchemy engine; queries never block the event loop
+engine = create_async_engine(to_async_url(DATABASE_URL), **_pool_options(DATABASE_URL))
+
+# Engine for read-only requests (GET endpoints). On file-based SQLite this
+# is a separate pool whose connections refuse writes, so dashboard reads
+# never wait behind the writer's connection; elsewhere it is the main engine.
+if _is_file_sqlite(DATABASE_URL):
+    read_engine = create_async_engine(to_async_url(DATABASE_URL), **_pool_options(DATABASE_URL))
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_write_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection)
+
+    @event.listens_for(read_engine.sync_engine, "connect")
+    def _on_read_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=True)
+else:
+    read_engine = engine
+
+# Session factories for DB operations. Objects stay usable after commit
+# (expire_on_commit=False) so responses can be built without extra I/O.
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for ORM models
 Base = declarative_base()
@@ -40,7 +136,7 @@ class Vendor(Base):
 
     # Basic vendor information
     name = Column(String, nullable=False, index=True)
-    email = Column(String, nullable=False)
+    email = Column(String, nullable=False, index=True)  # Looked up for every inbound email
     phone = Column(String)
     address = Column(Text)
     contact_person = Column(String)
@@ -48,8 +144,8 @@ class Vendor(Base):
     # Optional notes (e.g., history, preferences)
     notes = Column(Text)
 
-    # Timestamps for auditing
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Timestamps for auditing (created_at is the pagination sort key)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship: one vendor → many proposals
@@ -78,10 +174,10 @@ class RFP(Base):
     requirements = Column(JSON)  # Additional constraints/conditions
 
     # Status of RFP: draft, sent, closed
-    status = Column(String, default="draft")
+    status = Column(String, default="draft", index=True)
 
-    # Record timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Record timestamps (created_at is the list sort key)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship: one RFP → many proposals
@@ -94,12 +190,17 @@ class RFP(Base):
 class Proposal(Base):
     __tablename__ = "proposals"
 
+    # One proposal per vendor per RFP
+    __table_args__ = (
+        Index("uq_proposals_rfp_vendor", "rfp_id", "vendor_id", unique=True),
+    )
+
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
 
     # Foreign keys linking proposal to an RFP and a Vendor
-    rfp_id = Column(Integer, ForeignKey("rfps.id"), nullable=False)
-    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+    rfp_id = Column(Integer, ForeignKey("rfps.id"), nullable=False, index=True)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False, index=True)
 
     # Proposal details extracted from email or manually entered
     total_price = Column(Float)
@@ -120,7 +221,7 @@ class Proposal(Base):
 
     # Timestamps for lifecycle tracking
     received_at = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship back to RFP and Vendor
@@ -128,16 +229,145 @@ class Proposal(Base):
     vendor = relationship("Vendor", back_populates="proposals")
 
 
+# =======================
+# Proposal Comparison Table
+# =======================
+class ProposalComparison(Base):
+    __tablename__ = "proposal_comparisons"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # One stored comparison per RFP and variant
+    rfp_id = Column(Integer, ForeignKey("rfps.id"), nullable=False, index=True)
+
+    # Options the result was computed with (narrative flag, score weights)
+    variant = Column(String, nullable=False, default="")
+
+    # Hash of the proposal set (ids + updated_at) the result was computed from
+    fingerprint = Column(String, nullable=False)
+
+    # AI comparison result (ComparisonResult JSON)
+    result = Column(JSON)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("uq_proposal_comparisons_rfp_variant", "rfp_id", "variant", unique=True),
+    )
+
+
+# =======================
+# RFP Line Item Table
+# =======================
+class RFPLineItem(Base):
+    __tablename__ = "rfp_line_items"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # RFP the item belongs to and its position in RFP.items
+    rfp_id = Column(Integer, ForeignKey("rfps.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+
+    # Item as written, plus a normalized name used to match items across rows
+    name = Column(String, nullable=False)
+    name_key = Column(String, nullable=False, index=True)
+    quantity = Column(Float)
+    specifications = Column(JSON)
+
+
+# =======================
+# Proposal Line Item Table
+# =======================
+class ProposalLineItem(Base):
+    __tablename__ = "proposal_line_items"
+
+    # Serves "item X under unit price Y" lookups from the index alone
+    __table_args__ = (
+        Index("ix_proposal_line_items_name_key_unit_price", "name_key", "unit_price"),
+    )
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Proposal the item was quoted in; RFP and vendor are copied for filtering
+    proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=False, index=True)
+    rfp_id = Column(Integer, ForeignKey("rfps.id"), nullable=False, index=True)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+
+    # Quoted item (normalized from Proposal.items)
+    name = Column(String, nullable=False)
+    name_key = Column(String, nullable=False)
+    quantity = Column(Float)
+    unit_price = Column(Float)
+    total_price = Column(Float)
+
+
+# =======================
+# Outbound Email Table (outbox)
+# =======================
+class OutboundEmail(Base):
+    __tablename__ = "outbound_emails"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Send job this email belongs to (one job per send-rfp request)
+    job_id = Column(String, nullable=False, index=True)
+
+    # Which RFP goes to which vendor
+    rfp_id = Column(Integer, ForeignKey("rfps.id"), nullable=False)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+    to_email = Column(String, nullable=False)
+    vendor_name = Column(String)
+
+    # Delivery state: queued, sending, retrying, sent, failed
+    status = Column(String, default="queued", index=True)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_error = Column(Text)
+    sent_at = Column(DateTime)
+
+    # Record timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# =======================
+# Inbox State Table
+# =======================
+class InboxState(Base):
+    __tablename__ = "inbox_state"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Mailbox identifier (e.g. "imap:user@host/INBOX" or "maildir:/path")
+    source = Column(String, nullable=False, unique=True)
+
+    # High-water mark: last message key/UID that was processed
+    last_key = Column(String)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # =======================
 # Dependency for DB session (FastAPI-compatible)
 # =======================
-def get_db():
+async def get_db():
     """
-    Creates a new DB session for each request and ensures it is closed afterward.
+    Creates a new async DB session for each request and ensures it is closed afterward.
     Used as a FastAPI dependency.
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    """
+    Read-only counterpart of get_db for GET endpoints that never write.
+    """
+    async with ReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
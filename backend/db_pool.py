@@ -0,0 +1,61 @@
+# ------------------------------------------------------
+# This module provides the connection pool used for Postgres
+# and file-based SQLite. It behaves like SQLAlchemy's default
+# async queue pool but also records how long requests wait to
+# check out a connection, so the pool can be sized from data.
+# ------------------------------------------------------
+
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that counts checkouts, checkout timeouts
+    and checkout wait time. Counters restart when the pool is recreated.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return connection
+
+    def stats(self) -> dict:
+        """Current pool usage and checkout latency."""
+        return {
+            "pool_size": self.size(),
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_checkout_ms": round(self._wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_checkout_ms": round(self._wait_max * 1000, 3)
+        }
+
+
+def pool_stats(engine) -> dict:
+    """
+    Pool metrics for an engine. Pools without metering (e.g. the
+    default pool of in-memory SQLite) only report their type and status.
+    """
+    pool = engine.pool
+    if isinstance(pool, MeteredQueuePool):
+        return {"pool": type(pool).__name__, **pool.stats()}
+    return {"pool": type(pool).__name__, "status": pool.status()}
@@ -0,0 +1,218 @@
+# ------------------------------------------------------
+# This module runs the background dispatcher for the outbound
+# email queue (outbox). The send-rfp endpoint only enqueues
+# emails; the dispatcher drains the queue, sends them through
+# the SMTP pool and reschedules failures with exponential backoff.
+# ------------------------------------------------------
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import select, update, func
+from database import SessionLocal, RFP as RFPModel, OutboundEmail as OutboundEmailModel
+from email_service import send_rfp_to_vendors
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Retry policy: attempts per email, first retry delay and maximum delay (seconds)
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+
+# How often the queue is checked when idle, and how many emails one pass handles
+EMAIL_DISPATCH_POLL_SECONDS = float(os.getenv("EMAIL_DISPATCH_POLL_SECONDS", "5"))
+EMAIL_DISPATCH_BATCH_SIZE = int(os.getenv("EMAIL_DISPATCH_BATCH_SIZE", "100"))
+
+# Outbox states that still need a send attempt
+PENDING_STATUSES = ("queued", "retrying")
+
+
+def retry_delay_seconds(attempts: int) -> float:
+    """Exponential backoff: base, 2x base, 4x base ... capped at the maximum."""
+    return min(EMAIL_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), EMAIL_RETRY_MAX_SECONDS)
+
+
+def rfp_email_data(rfp: RFPModel) -> dict:
+    """RFP details included in the outgoing email."""
+    return {
+        "title": rfp.title,
+        "description": rfp.description,
+        "budget": rfp.budget,
+        "delivery_days": rfp.delivery_days,
+        "payment_terms": rfp.payment_terms,
+        "warranty_required": rfp.warranty_required,
+        "items": rfp.items or [],
+        "requirements": rfp.requirements or []
+    }
+
+
+class EmailDispatcher:
+    """
+    In-process background worker that drains the outbox table.
+    Runs as an asyncio task started with the application.
+    """
+
+    def __init__(self):
+        # Both are bound to the running event loop, so they are created in start()
+        self._task = None
+        self._wakeup = None
+
+    async def start(self) -> None:
+        """Recover interrupted sends and start the dispatch loop."""
+        self._wakeup = asyncio.Event()
+        async with SessionLocal() as db:
+            # Emails left in "sending" by a previous process never finished
+            await db.execute(
+                update(OutboundEmailModel).where(
+                    OutboundEmailModel.status == "sending"
+                ).values(status="queued")
+            )
+            await db.commit()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the dispatch loop (called on application shutdown)."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._wakeup = None
+
+    def wake(self) -> None:
+        """Signal that new emails were enqueued (no-op when not running)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.dispatch_due()
+            except Exception:
+                logger.exception("Email dispatch pass failed")
+                processed = 0
+
+            # Keep draining while there is work; otherwise sleep until woken,
+            # the next scheduled retry is due, or the poll interval passes
+            if processed:
+                continue
+            timeout = await self._seconds_until_next_due()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _seconds_until_next_due(self) -> float:
+        async with SessionLocal() as db:
+            next_due = (await db.execute(
+                select(func.min(OutboundEmailModel.next_attempt_at)).where(
+                    OutboundEmailModel.status.in_(PENDING_STATUSES)
+                )
+            )).scalar()
+        if next_due is None:
+            return EMAIL_DISPATCH_POLL_SECONDS
+        wait = (next_due - datetime.utcnow()).total_seconds()
+        return min(max(wait, 0.0), EMAIL_DISPATCH_POLL_SECONDS)
+
+    async def dispatch_due(self) -> int:
+        """
+        Send one batch of due emails. Returns how many were attempted.
+        """
+        async with SessionLocal() as db:
+            now = datetime.utcnow()
+            due = (await db.execute(
+                select(OutboundEmailModel).where(
+                    OutboundEmailModel.status.in_(PENDING_STATUSES),
+                    OutboundEmailModel.next_attempt_at <= now
+                ).order_by(OutboundEmailModel.next_attempt_at, OutboundEmailModel.id).limit(
+                    EMAIL_DISPATCH_BATCH_SIZE
+                )
+            )).scalars().all()
+            if not due:
+                return 0
+
+            # Claim the batch so status reads show it is in flight
+            for email in due:
+                email.status = "sending"
+            await db.commit()
+
+            # Group by RFP so each RFP is loaded once per batch
+            by_rfp = {}
+            for email in due:
+                by_rfp.setdefault(email.rfp_id, []).append(email)
+
+            try:
+                for rfp_id, emails in by_rfp.items():
+                    try:
+                        await self._send_rfp_batch(db, rfp_id, emails)
+                    except Exception as e:
+                        # e.g. an RFP the template cannot render; retried with backoff
+                        logger.exception("Sending RFP %s failed", rfp_id)
+                        for email in emails:
+                            self._record_attempt(email, f"Failed to send email: {str(e)}")
+                await db.commit()
+            except Exception:
+                # Never leave claimed emails in "sending": put them back in the queue
+                await db.rollback()
+                await db.execute(
+                    update(OutboundEmailModel).where(
+                        OutboundEmailModel.id.in_([email.id for email in due]),
+                        OutboundEmailModel.status == "sending"
+                    ).values(
+                        status="retrying",
+                        next_attempt_at=datetime.utcnow() + timedelta(seconds=retry_delay_seconds(1))
+                    )
+                )
+                await db.commit()
+                raise
+            return len(due)
+
+    async def _send_rfp_batch(self, db, rfp_id: int, emails: list) -> None:
+        """Send one RFP to the claimed emails and record each result."""
+        rfp = await db.get(RFPModel, rfp_id)
+        if not rfp:
+            for email in emails:
+                email.status = "failed"
+                email.last_error = "RFP not found"
+            return
+
+        results = await send_rfp_to_vendors(
+            [{"id": email.vendor_id, "name": email.vendor_name, "email": email.to_email} for email in emails],
+            rfp_email_data(rfp)
+        )
+
+        delivered = False
+        for email, result in zip(emails, results):
+            self._record_attempt(email, None if result["status"] == "sent" else result.get("error"))
+            delivered = delivered or result["status"] == "sent"
+
+        # The RFP counts as sent once at least one vendor received it
+        if delivered and rfp.status == "draft":
+            rfp.status = "sent"
+
+    @staticmethod
+    def _record_attempt(email: OutboundEmailModel, error: str = None) -> None:
+        """Mark an email sent (no error), or schedule a retry / give up after the last attempt."""
+        email.attempts = (email.attempts or 0) + 1
+        if error is None:
+            email.status = "sent"
+            email.sent_at = datetime.utcnow()
+            email.last_error = None
+        elif email.attempts >= EMAIL_MAX_ATTEMPTS:
+            email.status = "failed"
+            email.last_error = error
+        else:
+            email.status = "retrying"
+            email.last_error = error
+            email.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_delay_seconds(email.attempts))
+
+
+# Shared dispatcher started by the application lifespan
+email_dispatcher = EmailDispatcher()
@@ -1,14 +1,16 @@
 # ------------------------------------------------------
 # This module handles sending RFP emails to vendors using SMTP.
-# It builds both plain-text and HTML email versions and sends
-# them asynchronously using aiosmtplib.
+# Messages are rendered by email_templates (plain-text and HTML)
+# and sent asynchronously using aiosmtplib over a pool of persistent,
+# authenticated SMTP connections.
 # ------------------------------------------------------
 
 import os
+import time
+import asyncio
 import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from email_templates import RFPEmailTemplate
 
 load_dotenv()
 
@@ -17,170 +19,239 @@ SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
 
+# SMTP connection pool: number of open sessions, how many messages one
+# session may send before it is recycled, and how long a session may sit
+# idle before it is health-checked with NOOP (seconds)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "5"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+SMTP_HEALTHCHECK_IDLE_SECONDS = float(os.getenv("SMTP_HEALTHCHECK_IDLE_SECONDS", "30"))
 
-async def send_rfp_email(to_email: str, vendor_name: str, rfp_data: dict) -> bool:
+# Bulk sending: how many vendors are emailed in parallel,
+# and how long a single vendor send may take (seconds)
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "10"))
+EMAIL_SEND_TIMEOUT = float(os.getenv("EMAIL_SEND_TIMEOUT", "30"))
+
+
+# Errors that mean the SMTP session itself is broken (not just the message)
+SMTP_CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+
+class _PooledConnection:
+    """An authenticated SMTP session plus usage bookkeeping."""
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Pool of persistent, logged-in aiosmtplib.SMTP sessions.
+    Connections are reused across messages, health-checked with NOOP
+    after sitting idle, recycled after a maximum number of messages,
+    and replaced transparently when the server drops them.
+    """
+
+    def __init__(self, max_size: int, max_messages_per_connection: int, healthcheck_idle_seconds: float):
+        self.max_size = max_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.healthcheck_idle_seconds = healthcheck_idle_seconds
+
+        # Idle connections ready for reuse; the semaphore caps open sessions
+        self._idle = []
+        self._semaphore = asyncio.Semaphore(max_size)
+
+        # Counters exposed through stats()
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self.reconnects = 0
+        self.in_use = 0
+
+    async def send_message(self, message) -> None:
+        """
+        Send a message over a pooled connection.
+        If the session turns out to be dead, retry once on a fresh one.
+        """
+        for attempt in range(2):
+            conn = await self._acquire()
+            reusable = False
+            try:
+                await conn.smtp.send_message(message)
+                conn.messages_sent += 1
+                self.messages_sent += 1
+                reusable = True
+                return
+            except SMTP_CONNECTION_ERRORS:
+                if attempt == 1:
+                    raise
+                self.reconnects += 1
+            except aiosmtplib.SMTPException:
+                # Server rejected this message, but the session is still usable
+                reusable = True
+                raise
+            finally:
+                await self._release(conn, reusable)
+
+    async def close(self) -> None:
+        """Close all idle connections (called on application shutdown)."""
+        while self._idle:
+            conn = self._idle.pop()
+            await self._quit(conn)
+
+    def stats(self) -> dict:
+        """Return pool usage counters."""
+        return {
+            "max_size": self.max_size,
+            "in_use": self.in_use,
+            "idle": len(self._idle),
+            "connections_opened": self.connections_opened,
+            "messages_sent": self.messages_sent,
+            "reconnects": self.reconnects
+        }
+
+    async def _acquire(self) -> _PooledConnection:
+        await self._semaphore.acquire()
+        try:
+            # Prefer the most recently used idle connection
+            while self._idle:
+                conn = self._idle.pop()
+                if await self._is_healthy(conn):
+                    self.in_use += 1
+                    return conn
+                self._discard(conn)
+
+            conn = await self._connect()
+            self.in_use += 1
+            return conn
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def _release(self, conn: _PooledConnection, reusable: bool) -> None:
+        self.in_use -= 1
+        try:
+            if not reusable:
+                self._discard(conn)
+            elif conn.messages_sent >= self.max_messages_per_connection:
+                # Recycle long-lived sessions politely
+                await self._quit(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+        finally:
+            self._semaphore.release()
+
+    async def _connect(self) -> _PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            username=SMTP_USER,
+            password=SMTP_PASSWORD,
+            use_tls=SMTP_USE_TLS,
+        )
+        # connect() performs the TLS handshake and logs in
+        await smtp.connect()
+        self.connections_opened += 1
+        return _PooledConnection(smtp)
+
+    async def _is_healthy(self, conn: _PooledConnection) -> bool:
+        if not conn.smtp.is_connected:
+            return False
+        if time.monotonic() - conn.last_used < self.healthcheck_idle_seconds:
+            return True
+        try:
+            await conn.smtp.noop()
+            return True
+        except Exception:
+            return False
+
+    async def _quit(self, conn: _PooledConnection) -> None:
+        try:
+            await conn.smtp.quit()
+        except Exception:
+            self._discard(conn)
+
+    def _discard(self, conn: _PooledConnection) -> None:
+        try:
+            conn.smtp.close()
+        except Exception:
+            pass
+
+
+# Shared pool used for all outgoing RFP emails
+smtp_pool = SMTPConnectionPool(SMTP_POOL_SIZE, SMTP_MAX_MESSAGES_PER_CONNECTION, SMTP_HEALTHCHECK_IDLE_SECONDS)
+
+
+async def send_rfp_email(to_email: str, vendor_name: str, rfp_data: dict, template: RFPEmailTemplate = None) -> bool:
     """
     Send a structured RFP email to a vendor.
     Builds both plain-text and HTML formats and sends securely via SMTP.
+    Pass a pre-rendered `template` to avoid re-rendering the RFP
+    for every recipient.
     """
 
     # Ensure SMTP is configured before sending
     if not SMTP_USER or not SMTP_PASSWORD:
         raise Exception("SMTP credentials not configured")
-    
-    # Create an email container capable of holding multiple formats
-    message = MIMEMultipart("alternative")
-    message["Subject"] = f"Request for Proposal: {rfp_data.get('title', 'RFP')}"
-    message["From"] = SMTP_USER
-    message["To"] = to_email
-    
-    # -----------------------------
-    # Build PLAIN TEXT email body
-    # -----------------------------
 
-    text_body = f"""
-Dear {vendor_name},
-
-We are requesting a proposal for the following procurement:
-
-Title: {rfp_data.get('title', 'N/A')}
-Description: {rfp_data.get('description', 'N/A')}
-"""
-
-    # Add optional RFP fields only if present
-    if rfp_data.get('budget'):
-        text_body += f"Budget: ${rfp_data.get('budget'):,.2f}\n"
-    
-    if rfp_data.get('delivery_days'):
-        text_body += f"Delivery Required: {rfp_data.get('delivery_days')} days\n"
-    
-    if rfp_data.get('payment_terms'):
-        text_body += f"Payment Terms Required: {rfp_data.get('payment_terms')}\n"
-    
-    if rfp_data.get('warranty_required'):
-        text_body += f"Warranty Required: {rfp_data.get('warranty_required')}\n"
-    
-    # List items included in the RFP
-    if rfp_data.get('items'):
-        text_body += "\nItems Required:\n"
-        for item in rfp_data.get('items', []):
-            text_body += f"- {item.get('name', 'N/A')}"
-            if item.get('quantity'):
-                text_body += f" (Quantity: {item.get('quantity')})"
-            if item.get('specifications'):
-                # Convert specifications dict to "key: value" string
-                specs = ", ".join([f"{k}: {v}" for k, v in item.get('specifications', {}).items()])
-                text_body += f" - {specs}"
-            text_body += "\n"
-    
-    # Additional requirements list
-    if rfp_data.get('requirements'):
-        text_body += "\nAdditional Requirements:\n"
-        for req in rfp_data.get('requirements', []):
-            text_body += f"- {req}\n"
-    
-    # Closing instructions for vendor
-    text_body += "\n\nPlease reply to this email with your proposal including:\n"
-    text_body += "- Total price\n"
-    text_body += "- Delivery timeline\n"
-    text_body += "- Payment terms\n"
-    text_body += "- Warranty information\n"
-    text_body += "- Itemized pricing (if applicable)\n"
-    text_body += "- Any terms and conditions\n\n"
-    text_body += "Thank you for your interest.\n\nBest regards,\nProcurement Team"
-    
+    # Render RFP-dependent content once if the caller did not
+    if template is None:
+        template = RFPEmailTemplate(rfp_data)
 
-    # -----------------------------
-    # Build HTML email body
-    # -----------------------------
-
-    html_body = f"""
-    <html>
-      <body>
-        <h2>Request for Proposal: {rfp_data.get('title', 'RFP')}</h2>
-        <p>Dear {vendor_name},</p>
-        <p>We are requesting a proposal for the following procurement:</p>
-
-        <h3>Details:</h3>
-        <ul>
-          <li><strong>Title:</strong> {rfp_data.get('title', 'N/A')}</li>
-          <li><strong>Description:</strong> {rfp_data.get('description', 'N/A')}</li>
-    """
-
-    # Add optional fields if present
-    if rfp_data.get('budget'):
-        html_body += f"<li><strong>Budget:</strong> ${rfp_data.get('budget'):,.2f}</li>"
-    
-    if rfp_data.get('delivery_days'):
-        html_body += f"<li><strong>Delivery Required:</strong> {rfp_data.get('delivery_days')} days</li>"
-    
-    if rfp_data.get('payment_terms'):
-        html_body += f"<li><strong>Payment Terms Required:</strong> {rfp_data.get('payment_terms')}</li>"
-    
-    if rfp_data.get('warranty_required'):
-        html_body += f"<li><strong>Warranty Required:</strong> {rfp_data.get('warranty_required')}</li>"
-    
-    html_body += "</ul>"
-
-    # List items in HTML format
-    if rfp_data.get('items'):
-        html_body += "<h3>Items Required:</h3><ul>"
-        for item in rfp_data.get('items', []):
-            item_text = f"<li><strong>{item.get('name', 'N/A')}</strong>"
-            if item.get('quantity'):
-                item_text += f" (Quantity: {item.get('quantity')})"
-            if item.get('specifications'):
-                specs = ", ".join([f"{k}: {v}" for k, v in item.get('specifications', {}).items()])
-                item_text += f" - {specs}"
-            item_text += "</li>"
-            html_body += item_text
-        html_body += "</ul>"
-    
-    # List additional requirements
-    if rfp_data.get('requirements'):
-        html_body += "<h3>Additional Requirements:</h3><ul>"
-        for req in rfp_data.get('requirements', []):
-            html_body += f"<li>{req}</li>"
-        html_body += "</ul>"
-    
-
-    # Closing instructions
-    html_body += """
-        <h3>Please reply to this email with your proposal including:</h3>
-        <ul>
-          <li>Total price</li>
-          <li>Delivery timeline</li>
-          <li>Payment terms</li>
-          <li>Warranty information</li>
-          <li>Itemized pricing (if applicable)</li>
-          <li>Any terms and conditions</li>
-        </ul>
-        <p>Thank you for your interest.</p>
-        <p>Best regards,<br>Procurement Team</p>
-      </body>
-    </html>
-    """
-    
-    # Attach both plain-text and HTML versions
-    message.attach(MIMEText(text_body, "plain"))
-    message.attach(MIMEText(html_body, "html"))
-    
+    # Only the vendor-specific fields are filled in here
+    message = template.build_message(SMTP_USER, to_email, vendor_name)
 
     # -----------------------------
-    # Send email via SMTP
+    # Send email via pooled SMTP connection
     # -----------------------------
     try:
-        await aiosmtplib.send(
-            message,
-            hostname=SMTP_HOST,
-            port=SMTP_PORT,
-            username=SMTP_USER,
-            password=SMTP_PASSWORD,
-            use_tls=True,  # Secure TLS connection
-        )
+        await smtp_pool.send_message(message)
         return True
 
     except Exception as e:
         # Provide clear exception message if sending fails
         raise Exception(f"Failed to send email: {str(e)}")
+
+
+async def send_rfp_to_vendors(vendors: list, rfp_data: dict, concurrency: int = None, timeout: float = None) -> list:
+    """
+    Send an RFP email to many vendors concurrently.
+    At most `concurrency` sends run at once and each one is bounded
+    by `timeout` seconds. Returns one result dict per vendor, in the
+    same order as `vendors` (each vendor is a dict with id, name, email).
+    """
+    concurrency = concurrency or EMAIL_SEND_CONCURRENCY
+    timeout = timeout or EMAIL_SEND_TIMEOUT
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # Render the RFP once for the whole batch
+    template = RFPEmailTemplate(rfp_data)
+
+    async def send_one(vendor: dict) -> dict:
+        result = {"vendor_id": vendor["id"], "vendor_name": vendor["name"]}
+        async with semaphore:
+            try:
+                await asyncio.wait_for(
+                    send_rfp_email(vendor["email"], vendor["name"], rfp_data, template),
+                    timeout=timeout
+                )
+                result["status"] = "sent"
+            except asyncio.TimeoutError:
+                result["status"] = "failed"
+                result["error"] = f"Timed out after {timeout:g} seconds"
+            except Exception as e:
+                # Capture failures per vendor (email issues, SMTP, etc.)
+                result["status"] = "failed"
+                result["error"] = str(e)
+        return result
+
+    return await asyncio.gather(*(send_one(vendor) for vendor in vendors))
@@ -0,0 +1,168 @@
+# ------------------------------------------------------
+# This module renders the RFP email (plain-text and HTML).
+# Everything that depends only on the RFP is rendered once;
+# sending to each vendor then just splices in the vendor name
+# and wraps the result in a MIME message.
+# ------------------------------------------------------
+
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+
+def _format_specs(item: dict) -> str:
+    """Convert specifications to a "key: value, ..." string (text is used as is)."""
+    specifications = item.get('specifications')
+    if isinstance(specifications, dict):
+        return ", ".join([f"{k}: {v}" for k, v in specifications.items()])
+    if isinstance(specifications, (list, tuple)):
+        return ", ".join(str(spec) for spec in specifications)
+    return str(specifications)
+
+
+class RFPEmailTemplate:
+    """
+    Pre-rendered RFP email. Built once per RFP send job; the
+    per-vendor render only joins a few strings around vendor_name.
+    Output is identical to building each email from scratch.
+    """
+
+    def __init__(self, rfp_data: dict):
+        self.subject = f"Request for Proposal: {rfp_data.get('title', 'RFP')}"
+
+        # Text and HTML bodies are split into the parts before and
+        # after the vendor name
+        self.text_head = "\nDear "
+        self.text_tail = self._render_text_tail(rfp_data)
+        self.html_head = (
+            "\n    <html>\n      <body>\n"
+            f"        <h2>Request for Proposal: {rfp_data.get('title', 'RFP')}</h2>\n"
+            "        <p>Dear "
+        )
+        self.html_tail = self._render_html_tail(rfp_data)
+
+    def render_text(self, vendor_name: str) -> str:
+        """Plain-text body for one vendor."""
+        return f"{self.text_head}{vendor_name}{self.text_tail}"
+
+    def render_html(self, vendor_name: str) -> str:
+        """HTML body for one vendor."""
+        return f"{self.html_head}{vendor_name}{self.html_tail}"
+
+    def build_message(self, from_email: str, to_email: str, vendor_name: str) -> MIMEMultipart:
+        """Build the multipart (plain-text + HTML) message for one vendor."""
+        message = MIMEMultipart("alternative")
+        message["Subject"] = self.subject
+        message["From"] = from_email
+        message["To"] = to_email
+
+        # Attach both plain-text and HTML versions
+        message.attach(MIMEText(self.render_text(vendor_name), "plain"))
+        message.attach(MIMEText(self.render_html(vendor_name), "html"))
+        return message
+
+    @staticmethod
+    def _render_text_tail(rfp_data: dict) -> str:
+        parts = [
+            ",\n\nWe are requesting a proposal for the following procurement:\n\n",
+            f"Title: {rfp_data.get('title', 'N/A')}\n",
+            f"Description: {rfp_data.get('description', 'N/A')}\n",
+        ]
+
+        # Add optional RFP fields only if present
+        if rfp_data.get('budget'):
+            parts.append(f"Budget: ${rfp_data.get('budget'):,.2f}\n")
+        if rfp_data.get('delivery_days'):
+            parts.append(f"Delivery Required: {rfp_data.get('delivery_days')} days\n")
+        if rfp_data.get('payment_terms'):
+            parts.append(f"Payment Terms Required: {rfp_data.get('payment_terms')}\n")
+        if rfp_data.get('warranty_required'):
+            parts.append(f"Warranty Required: {rfp_data.get('warranty_required')}\n")
+
+        # List items included in the RFP
+        if rfp_data.get('items'):
+            parts.append("\nItems Required:\n")
+            for item in rfp_data.get('items', []):
+                parts.append(f"- {item.get('name', 'N/A')}")
+                if item.get('quantity'):
+                    parts.append(f" (Quantity: {item.get('quantity')})")
+                if item.get('specifications'):
+                    parts.append(f" - {_format_specs(item)}")
+                parts.append("\n")
+
+        # Additional requirements list
+        if rfp_data.get('requirements'):
+            parts.append("\nAdditional Requirements:\n")
+            for req in rfp_data.get('requirements', []):
+                parts.append(f"- {req}\n")
+
+        # Closing instructions for vendor
+        parts.append(
+            "\n\nPlease reply to this email with your proposal including:\n"
+            "- Total price\n"
+            "- Delivery timeline\n"
+            "- Payment terms\n"
+            "- Warranty information\n"
+            "- Itemized pricing (if applicable)\n"
+            "- Any terms and conditions\n\n"
+            "Thank you for your interest.\n\nBest regards,\nProcurement Team"
+        )
+        return "".join(parts)
+
+    @staticmethod
+    def _render_html_tail(rfp_data: dict) -> str:
+        parts = [
+            ",</p>\n"
+            "        <p>We are requesting a proposal for the following procurement:</p>\n\n"
+            "        <h3>Details:</h3>\n"
+            "        <ul>\n",
+            f"          <li><strong>Title:</strong> {rfp_data.get('title', 'N/A')}</li>\n",
+            f"          <li><strong>Description:</strong> {rfp_data.get('description', 'N/A')}</li>\n    ",
+        ]
+
+        # Add optional fields if present
+        if rfp_data.get('budget'):
+            parts.append(f"<li><strong>Budget:</strong> ${rfp_data.get('budget'):,.2f}</li>")
+        if rfp_data.get('delivery_days'):
+            parts.append(f"<li><strong>Delivery Required:</strong> {rfp_data.get('delivery_days')} days</li>")
+        if rfp_data.get('payment_terms'):
+            parts.append(f"<li><strong>Payment Terms Required:</strong> {rfp_data.get('payment_terms')}</li>")
+        if rfp_data.get('warranty_required'):
+            parts.append(f"<li><strong>Warranty Required:</strong> {rfp_data.get('warranty_required')}</li>")
+        parts.append("</ul>")
+
+        # List items in HTML format
+        if rfp_data.get('items'):
+            parts.append("<h3>Items Required:</h3><ul>")
+            for item in rfp_data.get('items', []):
+                parts.append(f"<li><strong>{item.get('name', 'N/A')}</strong>")
+                if item.get('quantity'):
+                    parts.append(f" (Quantity: {item.get('quantity')})")
+                if item.get('specifications'):
+                    parts.append(f" - {_format_specs(item)}")
+                parts.append("</li>")
+            parts.append("</ul>")
+
+        # List additional requirements
+        if rfp_data.get('requirements'):
+            parts.append("<h3>Additional Requirements:</h3><ul>")
+            for req in rfp_data.get('requirements', []):
+                parts.append(f"<li>{req}</li>")
+            parts.append("</ul>")
+
+        # Closing instructions
+        parts.append("""
+        <h3>Please reply to this email with your proposal including:</h3>
+        <ul>
+          <li>Total price</li>
+          <li>Delivery timeline</li>
+          <li>Payment terms</li>
+          <li>Warranty information</li>
+          <li>Itemized pricing (if applicable)</li>
+          <li>Any terms and conditions</li>
+        </ul>
+        <p>Thank you for your interest.</p>
+        <p>Best regards,<br>Procurement Team</p>
+      </body>
+    </html>
+    """)
+        return "".join(parts)
@@ -0,0 +1,227 @@
+# ------------------------------------------------------
+# This module decides how much model a vendor email needs.
+# Proposal extraction goes through tiers, cheapest first:
+# regex heuristics, then a small model, then the large model.
+# A tier's result is kept when the required fields are present
+# and its completeness_score meets the threshold; otherwise the
+# email escalates to the next tier. Per-tier hit rates and
+# latency are kept for /api/metrics.
+# ------------------------------------------------------
+
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tiers tried in order ("heuristic", "small", "large")
+EXTRACTION_TIERS = [
+    tier.strip() for tier in os.getenv("EXTRACTION_TIERS", "heuristic,small,large").split(",") if tier.strip()
+]
+
+# Model for the "small" tier (the "large" tier uses AI_MODEL_EXTRACT_PROPOSAL)
+AI_MODEL_EXTRACT_PROPOSAL_SMALL = os.getenv("AI_MODEL_EXTRACT_PROPOSAL_SMALL", "gpt-4o-mini")
+
+# When a tier's result is good enough to stop
+EXTRACTION_REQUIRED_FIELDS = [
+    field.strip() for field in os.getenv("EXTRACTION_REQUIRED_FIELDS", "total_price,delivery_days").split(",")
+    if field.strip()
+]
+EXTRACTION_MIN_COMPLETENESS = float(os.getenv("EXTRACTION_MIN_COMPLETENESS", "0.8"))
+
+_KNOWN_TIERS = ("heuristic", "small", "large")
+_unknown = [tier for tier in EXTRACTION_TIERS if tier not in _KNOWN_TIERS]
+if _unknown or not EXTRACTION_TIERS:
+    raise ValueError(f"Invalid EXTRACTION_TIERS: {', '.join(_unknown) or 'empty'} (use {', '.join(_KNOWN_TIERS)})")
+
+
+# ======================================================
+# Tier 1: regex heuristics
+# ======================================================
+
+_MONEY = r"\$\s?(\d[\d,]*(?:\.\d{1,2})?)"
+_TOTAL_RE = re.compile(r"\btotal\b[^$\n]{0,40}" + _MONEY, re.IGNORECASE)
+_DELIVERY_RE = re.compile(
+    r"(?:deliver\w*|ship\w*|lead\s+time|turnaround)[^.\n]{0,40}?\b(\d+)\s*(?:business\s+|working\s+)?(days?|weeks?)",
+    re.IGNORECASE
+)
+# Delivery matches that are really about payment ("delivery ... due 30 days after invoice")
+_PAYMENT_CLAUSE = re.compile(r"\b(pay\w*|invoice\w*|net|due)\b", re.IGNORECASE)
+_WARRANTY_RE = re.compile(
+    r"\b(\d+)[\s-]*(years?|months?)[\s-]+(?:\w+[\s-]+)?warranty|warranty[^.\n]{0,30}?\b(\d+)[\s-]*(years?|months?)",
+    re.IGNORECASE
+)
+_NET_TERMS_RE = re.compile(r"\bnet[\s-]*(\d+)\b", re.IGNORECASE)
+_UPFRONT_TERMS_RE = re.compile(r"\b(\d+)\s*%\s*(upfront|up-front|advance|deposit)", re.IGNORECASE)
+_UNIT_PRICE_HINT = re.compile(r"\b(each|per\s+unit|/\s*unit|unit\s+price|apiece|/\s*ea)\b", re.IGNORECASE)
+# Per-unit wording right after an amount ("$500 each", "$500/unit")
+_PER_UNIT_SUFFIX = re.compile(r"\s*(each\b|per\s+unit\b|/\s*(unit|ea)\b|apiece\b)", re.IGNORECASE)
+# Negated clauses ("we cannot deliver in 30 days"); "no later than" is not a negation
+_NEGATION = re.compile(r"\b(not|cannot|unable|never)\b|n't\b", re.IGNORECASE)
+_NOT_LATER_THAN = re.compile(r"\bnot?\s+(later|more)\s+than\b", re.IGNORECASE)
+_CLAUSE_BREAK = re.compile(r"[.;!?\n]|\bbut\b", re.IGNORECASE)
+
+
+def _money(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _is_unit_price(text: str, match) -> bool:
+    """Whether a money match is a per-unit price ("$500 each", "unit price $500")."""
+    return bool(_UNIT_PRICE_HINT.search(match.group(0)) or _PER_UNIT_SUFFIX.match(text, match.end()))
+
+
+def _is_negated(text: str, match) -> bool:
+    """Whether the clause leading up to a match's number is negated."""
+    before = _CLAUSE_BREAK.split(text[:match.start(1)])[-1]
+    return bool(_NEGATION.search(_NOT_LATER_THAN.sub("", before)))
+
+
+def _single_value(values: list):
+    """The value if all candidates agree; None when there are none or they conflict."""
+    return values[0] if values and len(set(values)) == 1 else None
+
+
+def _item_name(item: dict) -> str:
+    return str(item.get("name") or "").strip()
+
+
+def _quoted_item(rfp_item: dict, lines: list, names: list):
+    """
+    Price of one RFP item from the first email line naming it (None if not
+    quoted). Lines naming several RFP items are skipped: their amounts
+    cannot be told apart reliably.
+    """
+    name = _item_name(rfp_item)
+    if not name:
+        return None
+    quantity = rfp_item.get("quantity") if isinstance(rfp_item.get("quantity"), (int, float)) else 1
+    for line in lines:
+        named = [other for other in names if other.lower() in line.lower()]
+        if named != [name]:
+            continue
+        amounts = [_money(amount) for amount in re.findall(_MONEY, line)]
+        if not amounts:
+            continue
+        if len(amounts) >= 2:
+            unit_price, total_price = min(amounts), max(amounts)
+        elif _UNIT_PRICE_HINT.search(line):
+            unit_price, total_price = amounts[0], round(amounts[0] * quantity, 2)
+        else:
+            total_price = amounts[0]
+            unit_price = round(total_price / quantity, 2) if quantity else total_price
+        return {"name": name, "quantity": quantity, "unit_price": unit_price, "total_price": total_price}
+    return None
+
+
+def heuristic_extract(email_content: str, rfp_data: dict) -> dict:
+    """
+    Extract price, delivery days, warranty, payment terms and item prices
+    with regular expressions. completeness_score is the share of those
+    fields that were found, so unclear emails fall through to a model.
+    Per-unit prices, negated delivery promises and conflicting values
+    are not taken as the total or delivery time.
+    """
+    text = email_content or ""
+    lines = text.splitlines()
+
+    # Conflicting totals or delivery times are left empty so a model decides
+    totals = [_money(total.group(1)) for total in _TOTAL_RE.finditer(text) if not _is_unit_price(text, total)]
+    if not totals:
+        amounts = list(re.finditer(_MONEY, text))
+        if len(amounts) == 1 and not _is_unit_price(text, amounts[0]):
+            totals = [_money(amounts[0].group(1))]
+    total_price = _single_value(totals)
+
+    delivery_days = _single_value([
+        int(delivery.group(1)) * (7 if delivery.group(2).lower().startswith("week") else 1)
+        for delivery in _DELIVERY_RE.finditer(text)
+        if not _PAYMENT_CLAUSE.search(delivery.group(0)) and not _is_negated(text, delivery)
+    ])
+
+    warranty = _WARRANTY_RE.search(text)
+    if warranty:
+        number, unit = (warranty.group(1), warranty.group(2)) if warranty.group(1) else (warranty.group(3), warranty.group(4))
+        warranty = f"{number} {unit.lower().rstrip('s')}{'' if number == '1' else 's'}"
+
+    net_terms = _NET_TERMS_RE.search(text)
+    upfront_terms = _UPFRONT_TERMS_RE.search(text)
+    payment_terms = None
+    if net_terms:
+        payment_terms = f"Net {net_terms.group(1)}"
+    elif upfront_terms:
+        payment_terms = f"{upfront_terms.group(1)}% {upfront_terms.group(2).lower()}"
+
+    rfp_items = [item for item in (rfp_data.get("items") or []) if isinstance(item, dict)]
+    names = [_item_name(item) for item in rfp_items if _item_name(item)]
+    items = [quoted for quoted in (_quoted_item(item, lines, names) for item in rfp_items) if quoted]
+
+    # Items only count once every RFP item is priced
+    found = [total_price is not None, delivery_days is not None, warranty is not None, payment_terms is not None]
+    if rfp_items:
+        found.append(len(items) == len(rfp_items))
+
+    return {
+        "total_price": total_price,
+        "delivery_days": delivery_days,
+        "payment_terms": payment_terms,
+        "warranty": warranty,
+        "items": items,
+        "terms_conditions": None,
+        "completeness_score": round(sum(found) / len(found), 2)
+    }
+
+
+def is_confident(result, rfp_data: dict = None) -> bool:
+    """
+    True when a tier's result has every required field and enough
+    completeness. With `rfp_data`, every RFP item must also be priced
+    (used for the heuristic tier, whose item matching is the weakest).
+    """
+    if not isinstance(result, dict):
+        return False
+    if rfp_data is not None:
+        rfp_items = [item for item in (rfp_data.get("items") or []) if isinstance(item, dict)]
+        if len(result.get("items") or []) < len(rfp_items):
+            return False
+    if any(result.get(field) in (None, "", [], {}) for field in EXTRACTION_REQUIRED_FIELDS):
+        return False
+    try:
+        return float(result.get("completeness_score") or 0) >= EXTRACTION_MIN_COMPLETENESS
+    except (TypeError, ValueError):
+        return False
+
+
+# ======================================================
+# Per-tier metrics
+# ======================================================
+
+class ExtractionTierStats:
+    """Attempts, accepted results, errors and latency of each extraction tier."""
+
+    def __init__(self):
+        self._tiers = {}
+
+    def record(self, tier: str, seconds: float, outcome: str) -> None:
+        """Record one attempt; outcome is "accepted", "escalated" or "error"."""
+        entry = self._tiers.setdefault(tier, {"attempts": 0, "accepted": 0, "escalated": 0, "errors": 0, "seconds": 0.0})
+        entry["attempts"] += 1
+        entry["seconds"] += seconds
+        entry["errors" if outcome == "error" else outcome] += 1
+
+    def stats(self) -> dict:
+        return {
+            tier: {
+                "attempts": entry["attempts"],
+                "accepted": entry["accepted"],
+                "escalated": entry["escalated"],
+                "errors": entry["errors"],
+                "hit_rate": round(entry["accepted"] / entry["attempts"], 3),
+                "avg_latency_ms": round(1000 * entry["seconds"] / entry["attempts"], 1)
+            }
+            for tier, entry in self._tiers.items()
+        }
+
+
+# Shared instance used by ai_service
+extraction_tier_stats = ExtractionTierStats()
@@ -0,0 +1,305 @@
+# ------------------------------------------------------
+# This module polls a mailbox for vendor replies and feeds them
+# into the same parsing path as POST /api/email/receive.
+# Sources: IMAP (production) or a local Maildir/mbox (testing).
+# Messages are fetched one at a time; handled Maildir messages
+# move to cur/ and other sources store a high-water mark per
+# mailbox, so nothing is processed twice.
+# ------------------------------------------------------
+
+import os
+import re
+import html
+import email
+import asyncio
+import imaplib
+import logging
+import mailbox
+from email import policy
+from email.utils import parseaddr
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import select
+from database import SessionLocal, InboxState as InboxStateModel
+from schemas import ReceiveEmailRequest
+from ai_rate_limiter import ai_priority, PRIORITY_BATCH
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Inbox configuration: INBOX_SOURCE is "imap", "maildir", "mbox" or empty (disabled)
+INBOX_SOURCE = os.getenv("INBOX_SOURCE", "").lower()
+INBOX_PATH = os.getenv("INBOX_PATH")  # Maildir directory or mbox file
+INBOX_POLL_SECONDS = float(os.getenv("INBOX_POLL_SECONDS", "60"))
+INBOX_BATCH_SIZE = int(os.getenv("INBOX_BATCH_SIZE", "50"))
+
+# IMAP settings (credentials default to the SMTP account)
+IMAP_HOST = os.getenv("IMAP_HOST", "imap.gmail.com")
+IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+IMAP_USER = os.getenv("IMAP_USER", os.getenv("SMTP_USER"))
+IMAP_PASSWORD = os.getenv("IMAP_PASSWORD", os.getenv("SMTP_PASSWORD"))
+IMAP_FOLDER = os.getenv("IMAP_FOLDER", "INBOX")
+
+
+# ======================================================
+# Mailbox sources
+# ======================================================
+
+class MaildirSource:
+    """
+    Local Maildir. Unhandled messages are the ones in new/; handled
+    ones are moved to cur/ (key names do not sort in delivery order,
+    so no high-water mark is used).
+    """
+
+    def __init__(self, path: str):
+        self.name = f"maildir:{path}"
+        self._path = path
+        self._mailbox = mailbox.Maildir(path, create=False)
+
+    def keys_after(self, last_key) -> list:
+        names = os.listdir(os.path.join(self._path, "new"))
+        return sorted(name.split(self._mailbox.colon)[0] for name in names if not name.startswith("."))
+
+    def fetch(self, key) -> bytes:
+        return self._mailbox.get_bytes(key)
+
+    def mark_done(self, key) -> None:
+        message = self._mailbox.get_message(key)
+        message.set_subdir("cur")
+        message.add_flag("S")
+        self._mailbox[key] = message
+
+    def close(self) -> None:
+        pass
+
+
+class MboxSource:
+    """Local mbox file. Messages are only ever appended, so keys are positions."""
+
+    def __init__(self, path: str):
+        self.name = f"mbox:{path}"
+        self._path = path
+        self._mailbox = None
+
+    def keys_after(self, last_key) -> list:
+        # Re-open each poll to see newly appended messages
+        self._mailbox = mailbox.mbox(self._path, create=False)
+        start = int(last_key) + 1 if last_key is not None else 0
+        return [str(key) for key in range(start, len(self._mailbox))]
+
+    def fetch(self, key) -> bytes:
+        return self._mailbox.get_bytes(int(key))
+
+    def mark_done(self, key) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._mailbox is not None:
+            self._mailbox.close()
+            self._mailbox = None
+
+
+class IMAPSource:
+    """
+    IMAP folder. Keys are "<UIDVALIDITY>:<UID>"; if the server resets
+    UIDVALIDITY the folder is read again from the start.
+    """
+
+    def __init__(self, host: str, port: int, user: str, password: str, folder: str):
+        self.name = f"imap:{user}@{host}/{folder}"
+        self._host, self._port = host, port
+        self._user, self._password = user, password
+        self._folder = folder
+        self._conn = None
+        self._uidvalidity = None
+
+    def keys_after(self, last_key) -> list:
+        if not self._user or not self._password:
+            raise Exception("IMAP credentials not configured")
+
+        self._conn = imaplib.IMAP4_SSL(self._host, self._port)
+        self._conn.login(self._user, self._password)
+        self._conn.select(self._folder, readonly=True)
+        self._uidvalidity = self._conn.untagged_responses.get("UIDVALIDITY", [b"0"])[0].decode()
+
+        last_uid = 0
+        if last_key:
+            validity, _, uid = last_key.partition(":")
+            if validity == self._uidvalidity:
+                last_uid = int(uid)
+
+        # "UID n:*" always includes the newest message, so filter explicitly
+        _, data = self._conn.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+        uids = sorted(int(uid) for uid in (data[0] or b"").split() if int(uid) > last_uid)
+        return [f"{self._uidvalidity}:{uid}" for uid in uids]
+
+    def fetch(self, key) -> bytes:
+        uid = key.partition(":")[2]
+        _, data = self._conn.uid("FETCH", uid, "(BODY.PEEK[])")
+        for part in data:
+            if isinstance(part, tuple):
+                return part[1]
+        raise Exception(f"IMAP message {uid} could not be fetched")
+
+    def mark_done(self, key) -> None:
+        # The folder is opened read-only; the UID high-water mark tracks progress
+        pass
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.logout()
+            except Exception:
+                pass
+            self._conn = None
+
+
+def build_source():
+    """Create the configured mailbox source, or None if polling is disabled."""
+    if INBOX_SOURCE == "imap":
+        return IMAPSource(IMAP_HOST, IMAP_PORT, IMAP_USER, IMAP_PASSWORD, IMAP_FOLDER)
+    if INBOX_SOURCE == "maildir":
+        return MaildirSource(INBOX_PATH)
+    if INBOX_SOURCE == "mbox":
+        return MboxSource(INBOX_PATH)
+    return None
+
+
+# ======================================================
+# MIME parsing
+# ======================================================
+
+def parse_vendor_email(raw: bytes) -> ReceiveEmailRequest:
+    """
+    Turn a raw RFC 822 message into a ReceiveEmailRequest.
+    Prefers the plain-text part; falls back to HTML with tags stripped.
+    """
+    message = email.message_from_bytes(raw, policy=policy.default)
+    from_email = parseaddr(message.get("From", ""))[1]
+    subject = str(message.get("Subject", ""))
+
+    body = ""
+    part = message.get_body(preferencelist=("plain", "html"))
+    if part is not None:
+        body = part.get_content()
+        if part.get_content_type() == "text/html":
+            body = html.unescape(re.sub(r"<[^>]+>", " ", body))
+
+    return ReceiveEmailRequest(from_email=from_email, subject=subject, body=body.strip())
+
+
+# ======================================================
+# Poller
+# ======================================================
+
+def _is_unmatched(error: Exception) -> bool:
+    """Replies that can never be processed (no RFP ID, unknown RFP or vendor)."""
+    return isinstance(error, HTTPException) and error.status_code < 500
+
+
+class InboxPoller:
+    """
+    Background worker that polls the configured mailbox and passes
+    each new message to the vendor email parsing path.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def start(self) -> None:
+        """Start polling if an inbox source is configured."""
+        if INBOX_SOURCE:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling (called on application shutdown)."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                result = await self.poll()
+                if result["remaining"] and not result["deferred"]:
+                    continue
+            except Exception:
+                logger.exception("Inbox poll failed")
+            await asyncio.sleep(INBOX_POLL_SECONDS)
+
+    async def poll(self, source=None) -> dict:
+        """
+        Process up to INBOX_BATCH_SIZE new messages. A message is marked
+        done once it was processed or can never be (unparseable or
+        unmatched). On any other failure the batch stops and the message
+        is retried on the next poll ("deferred").
+        """
+        # Imported here to avoid a circular import with the email router
+        from routers.email import receive_vendor_email
+
+        source = source or build_source()
+        if source is None:
+            raise Exception("Inbox polling is not configured (set INBOX_SOURCE)")
+
+        async with self._lock:
+            processed, failed, deferred = 0, 0, 0
+            try:
+                async with SessionLocal() as db:
+                    state = (await db.execute(
+                        select(InboxStateModel).where(InboxStateModel.source == source.name)
+                    )).scalar_one_or_none()
+                    if not state:
+                        state = InboxStateModel(source=source.name)
+                        db.add(state)
+                        await db.commit()
+
+                    # Only keys are listed up front; message bodies are fetched one by one
+                    keys = await asyncio.to_thread(source.keys_after, state.last_key)
+                    for key in keys[:INBOX_BATCH_SIZE]:
+                        raw = await asyncio.to_thread(source.fetch, key)
+                        try:
+                            request = parse_vendor_email(raw)
+                        except Exception as e:
+                            request = None
+                            failed += 1
+                            logger.warning("Skipping unparseable inbox message %s: %s", key, e)
+
+                        if request is not None:
+                            try:
+                                # Background work yields to interactive AI calls
+                                with ai_priority(PRIORITY_BATCH):
+                                    await receive_vendor_email(request)
+                                processed += 1
+                            except Exception as e:
+                                if not _is_unmatched(e):
+                                    # Model or database trouble: try this message again next poll
+                                    deferred += 1
+                                    logger.warning("Deferring inbox message %s: %s", key, getattr(e, "detail", e))
+                                    break
+                                failed += 1
+                                logger.warning("Skipping inbox message %s: %s", key, e.detail)
+
+                        await asyncio.to_thread(source.mark_done, key)
+                        state.last_key = key
+                        await db.commit()
+
+                    return {
+                        "source": source.name,
+                        "processed": processed,
+                        "failed": failed,
+                        "deferred": deferred,
+                        "remaining": max(len(keys) - processed - failed, 0)
+                    }
+            finally:
+                await asyncio.to_thread(source.close)
+
+
+# Shared poller started by the application lifespan
+inbox_poller = InboxPoller()
@@ -10,7 +10,17 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import uvicorn
 
-from database import engine, Base
+from database import engine, read_engine, Base
+from migrations import run_migrations
+from db_pool import pool_stats
+from ai_backends import ai_backend
+from ai_cache import ai_result_cache
+from single_flight import ai_single_flight
+from extraction_router import extraction_tier_stats
+from ai_rate_limiter import ai_rate_limiter
+from email_service import smtp_pool
+from email_dispatcher import email_dispatcher
+from inbox_service import inbox_poller
 from routers import rfps, vendors, proposals, email
 
 
@@ -20,9 +30,26 @@ from routers import rfps, vendors, proposals, email
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Create all database tables automatically at startup
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Upgrade existing databases (indexes, schema changes) in place
+    await run_migrations(engine)
+
+    # Start draining the outbound email queue in the background
+    await email_dispatcher.start()
+
+    # Poll the vendor reply inbox (only if INBOX_SOURCE is configured)
+    inbox_poller.start()
     yield  # Continue running the application
 
+    # Stop background workers, then close pooled SMTP sessions
+    await inbox_poller.stop()
+    await email_dispatcher.stop()
+    await smtp_pool.close()
+    await engine.dispose()
+    await read_engine.dispose()
+
 
 # ------------------------------------------------------
 # Initialize FastAPI application
@@ -44,6 +71,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],       # Allow all HTTP methods
     allow_headers=["*"],       # Allow all custom headers
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],  # Pagination headers
 )
 
 
@@ -69,6 +97,20 @@ async def health():
     """Health check endpoint for monitoring."""
     return {"status": "healthy"}
 
+@app.get("/api/metrics")
+async def metrics():
+    """Runtime counters for monitoring (AI cache usage, SMTP and database pools, etc.)."""
+    return {
+        "ai_backend": ai_backend.name,
+        "ai_cache": ai_result_cache.stats(),
+        "ai_single_flight": ai_single_flight.stats(),
+        "ai_rate_limiter": ai_rate_limiter.stats(),
+        "extraction_tiers": extraction_tier_stats.stats(),
+        "smtp_pool": smtp_pool.stats(),
+        "db_pool": pool_stats(engine),
+        "db_read_pool": pool_stats(read_engine)
+    }
+
 
 # ------------------------------------------------------
 # Run the server (only when executed directly)
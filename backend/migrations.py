@@ -0,0 +1,114 @@
+# ------------------------------------------------------
+# This module upgrades existing databases in place.
+# Base.metadata.create_all only creates missing tables, so
+# changes to existing tables (such as new indexes) are applied
+# here as numbered migrations. The schema_version table records
+# which migrations a database has already received.
+# Works on SQLite and Postgres.
+# ------------------------------------------------------
+
+from datetime import datetime
+from sqlalchemy import text, select, insert, delete
+from database import RFP, Proposal, ProposalComparison, RFPLineItem, ProposalLineItem
+from repository import rfp_line_item_rows, proposal_line_item_rows
+
+
+def _add_hot_column_indexes(conn) -> None:
+    """
+    Index the columns used by hot lookups and list sorting, and
+    enforce one proposal per (rfp_id, vendor_id).
+    """
+    # Keep only the newest proposal per vendor/RFP before adding the unique index
+    conn.execute(text(
+        "DELETE FROM proposals WHERE id NOT IN ("
+        " SELECT MAX(id) FROM proposals GROUP BY rfp_id, vendor_id)"
+    ))
+
+    # Index names match the ones SQLAlchemy generates for new databases
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_vendors_email ON vendors (email)",
+        "CREATE INDEX IF NOT EXISTS ix_vendors_created_at ON vendors (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_rfps_status ON rfps (status)",
+        "CREATE INDEX IF NOT EXISTS ix_rfps_created_at ON rfps (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_proposals_rfp_id ON proposals (rfp_id)",
+        "CREATE INDEX IF NOT EXISTS ix_proposals_vendor_id ON proposals (vendor_id)",
+        "CREATE INDEX IF NOT EXISTS ix_proposals_created_at ON proposals (created_at)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_proposals_rfp_vendor ON proposals (rfp_id, vendor_id)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _backfill_line_items(conn) -> None:
+    """
+    Fill rfp_line_items and proposal_line_items from the JSON items
+    of existing RFPs and proposals. Safe to re-run: rows are rebuilt.
+    """
+    conn.execute(delete(RFPLineItem))
+    conn.execute(delete(ProposalLineItem))
+
+    rows = []
+    for rfp_id, items in conn.execute(select(RFP.id, RFP.items)):
+        rows.extend(rfp_line_item_rows(rfp_id, items))
+    if rows:
+        conn.execute(insert(RFPLineItem), rows)
+
+    rows = []
+    for proposal_id, rfp_id, vendor_id, items in conn.execute(
+        select(Proposal.id, Proposal.rfp_id, Proposal.vendor_id, Proposal.items)
+    ):
+        rows.extend(proposal_line_item_rows(proposal_id, rfp_id, vendor_id, items))
+    if rows:
+        conn.execute(insert(ProposalLineItem), rows)
+
+
+def _key_comparisons_by_variant(conn) -> None:
+    """
+    Recreate proposal_comparisons with a variant column and a unique
+    (rfp_id, variant) key. Stored results are only a cache, so they are
+    dropped rather than converted; they are recomputed on next view.
+    """
+    ProposalComparison.__table__.drop(conn, checkfirst=True)
+    ProposalComparison.__table__.create(conn)
+
+
+# Ordered list of (version, description, upgrade function).
+# Append new migrations to the end; never renumber existing ones.
+MIGRATIONS = [
+    (1, "Add indexes for hot lookup columns", _add_hot_column_indexes),
+    (2, "Backfill normalized line item tables", _backfill_line_items),
+    (3, "Key stored comparisons by RFP and variant", _key_comparisons_by_variant),
+]
+
+
+def _run_migrations_sync(conn) -> list:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL)"
+    ))
+    conn.commit()
+    current = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        if version <= current:
+            continue
+        upgrade(conn)
+        conn.execute(
+            text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+            {"v": version, "d": description, "t": datetime.utcnow()}
+        )
+        conn.commit()
+        applied.append(version)
+    return applied
+
+
+async def run_migrations(engine) -> list:
+    """
+    Apply every migration newer than the database's recorded version.
+    Each migration is committed on its own. Returns the versions applied.
+    """
+    async with engine.connect() as conn:
+        return await conn.run_sync(_run_migrations_sync)
@@ -0,0 +1,83 @@
+# ------------------------------------------------------
+# This module implements cursor (keyset) pagination shared by
+# the list endpoints. Rows are ordered by (created_at, id) and
+# the cursor encodes the last row of the previous page, so each
+# page is an indexed range scan instead of an OFFSET.
+# ------------------------------------------------------
+
+import base64
+from datetime import datetime
+from fastapi import HTTPException, Response
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Supported sort options ("-" prefix means newest first)
+SORT_OPTIONS = ("created_at", "-created_at")
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the (created_at, id) position of a row as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor back into (created_at, id); invalid cursors are a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(db: AsyncSession, query, model, response: Response, limit: int, cursor: str = None, sort: str = "-created_at") -> list:
+    """
+    Apply keyset pagination to a filtered select() statement.
+    Sets X-Total-Count (count of all matching rows) and, when more rows
+    exist, X-Next-Cursor to pass as `cursor` for the next page.
+    """
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort. Use one of: {', '.join(SORT_OPTIONS)}"
+        )
+    descending = sort.startswith("-")
+
+    # Cheap count path: COUNT over the same filters, no rows loaded
+    count_query = select(func.count(model.id))
+    if query.whereclause is not None:
+        count_query = count_query.where(query.whereclause)
+    total = (await db.execute(count_query)).scalar()
+    response.headers["X-Total-Count"] = str(total)
+
+    # Continue after the last row of the previous page
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.where(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < row_id)
+            ))
+        else:
+            query = query.where(or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > row_id)
+            ))
+
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+
+    # Fetch one extra row to know whether another page exists
+    rows = list((await db.execute(query.limit(limit + 1))).scalars().all())
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows
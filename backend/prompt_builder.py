@@ -0,0 +1,125 @@
+# ------------------------------------------------------
+# This module keeps AI prompts within a token budget.
+# Context such as RFP items and proposal summaries is written
+# as compact JSON with empty fields removed; item lists that
+# still do not fit are cut down and the rest summarized.
+# Token counts for every call are logged.
+# ------------------------------------------------------
+
+import os
+import json
+import logging
+from dotenv import load_dotenv
+
+# tiktoken gives exact counts when installed; otherwise ~4 characters per token
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Maximum prompt size (tokens) for one AI call, including instructions
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "6000"))
+
+# Item fields sent to the model when comparing proposals
+PROPOSAL_ITEM_FIELDS = ("name", "quantity", "unit_price", "total_price")
+
+# Encodings are loaded once per model
+_encodings = {}
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Number of tokens `text` uses for `model` (estimated if tiktoken is missing)."""
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return len(_encodings[model].encode(text))
+
+
+def count_message_tokens(messages: list, model: str = "gpt-4") -> int:
+    """Tokens used by a chat message list (content plus ~4 tokens framing per message)."""
+    return sum(count_tokens(message["content"], model) + 4 for message in messages) + 2
+
+
+def compact_json(value) -> str:
+    """JSON without indentation or spaces after separators."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def strip_empty(value):
+    """Recursively drop None, empty strings, lists and dicts."""
+    if isinstance(value, dict):
+        cleaned = {key: strip_empty(item) for key, item in value.items()}
+        return {key: item for key, item in cleaned.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [strip_empty(item) for item in value if item not in (None, "", [], {})]
+    return value
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+
+
+def fit_items(items: list, max_tokens: int, model: str = "gpt-4", fields: tuple = None) -> list:
+    """
+    Shrink an item list until its compact JSON fits in `max_tokens`.
+    Steps, stopping as soon as the list fits:
+    1. keep only `fields` (if given) and drop empty values
+    2. drop specifications
+    3. keep the leading items that fit and summarize the rest as one entry
+    """
+    cleaned = [
+        strip_empty({key: value for key, value in item.items() if fields is None or key in fields})
+        for item in (items or []) if isinstance(item, dict)
+    ]
+    if count_tokens(compact_json(cleaned), model) <= max_tokens:
+        return cleaned
+
+    slim = [{key: value for key, value in item.items() if key != "specifications"} for item in cleaned]
+    if count_tokens(compact_json(slim), model) <= max_tokens:
+        return slim
+
+    # Reserve room for the summary entry, then add items until the budget is used
+    summary_reserve = 40
+    used, kept = 2, []
+    for item in slim:
+        cost = count_tokens(compact_json(item), model) + 1
+        if used + cost > max_tokens - summary_reserve:
+            break
+        kept.append(item)
+        used += cost
+
+    rest = slim[len(kept):]
+    summary = strip_empty({
+        "omitted_items": len(rest),
+        "omitted_quantity": sum(_number(item.get("quantity")) for item in rest) or None,
+        "omitted_total_price": sum(_number(item.get("total_price")) for item in rest) or None
+    })
+    return kept + [summary]
+
+
+def log_prompt(operation: str, model: str, messages: list) -> int:
+    """Log (and return) the prompt size of an AI call; warns when over budget."""
+    tokens = count_message_tokens(messages, model)
+    if tokens > AI_PROMPT_TOKEN_BUDGET:
+        logger.warning("AI %s prompt uses %d tokens (budget %d, model %s)", operation, tokens, AI_PROMPT_TOKEN_BUDGET, model)
+    else:
+        logger.info("AI %s prompt uses %d tokens (model %s)", operation, tokens, model)
+    return tokens
+
+
+def log_usage(operation: str, model: str, response) -> None:
+    """Log the token usage reported by the API for a completed call."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        logger.info(
+            "AI %s used %s prompt + %s completion tokens (model %s)",
+            operation, usage.prompt_tokens, usage.completion_tokens, model
+        )
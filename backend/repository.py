@@ -0,0 +1,202 @@
+# ------------------------------------------------------
+# This module contains database operations shared by several
+# routers: the race-free proposal upsert, storing/invalidating
+# AI comparison results for an RFP's proposal set, and keeping
+# the normalized line item tables in step with the JSON items.
+# ------------------------------------------------------
+
+import re
+import json
+import hashlib
+from datetime import datetime
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql, sqlite
+from database import Proposal as ProposalModel, ProposalComparison as ProposalComparisonModel
+from database import RFPLineItem as RFPLineItemModel, ProposalLineItem as ProposalLineItemModel
+
+
+def _dialect_insert(db: AsyncSession):
+    """INSERT construct with ON CONFLICT support for the session's database."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+async def upsert_proposal(db: AsyncSession, proposal_data: dict) -> ProposalModel:
+    """
+    Insert a proposal, or update the vendor's existing proposal for the
+    same RFP, in a single INSERT ... ON CONFLICT (rfp_id, vendor_id)
+    DO UPDATE statement. Concurrent replies from one vendor can never
+    create duplicates. Does not commit.
+    """
+    now = datetime.utcnow()
+    stmt = _dialect_insert(db)(ProposalModel).values(
+        **proposal_data, received_at=now, created_at=now, updated_at=now
+    )
+
+    # On conflict overwrite every provided field except the identifiers
+    update_fields = {
+        field: stmt.excluded[field]
+        for field in proposal_data
+        if field not in ["rfp_id", "vendor_id"]
+    }
+    update_fields["updated_at"] = now
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProposalModel.rfp_id, ProposalModel.vendor_id],
+        set_=update_fields
+    ).returning(ProposalModel.id)
+
+    proposal_id = (await db.execute(stmt)).scalar_one()
+
+    # Load the row, replacing any stale copy in the session
+    return await db.get(ProposalModel, proposal_id, populate_existing=True)
+
+
+def proposal_set_fingerprint(proposals: list, rfp_data: dict = None) -> str:
+    """
+    Build a fingerprint of a proposal set from proposal ids and
+    their updated_at timestamps, plus the RFP fields the comparison
+    reads (`rfp_data`, e.g. budget and delivery_days). Any added or
+    edited proposal, or a changed RFP, changes the fingerprint.
+    """
+    parts = sorted(
+        f"{prop.id}:{prop.updated_at.isoformat() if prop.updated_at else ''}"
+        for prop in proposals
+    )
+    if rfp_data is not None:
+        parts.append(json.dumps(rfp_data, sort_keys=True, default=str))
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+async def get_stored_comparison(db: AsyncSession, rfp_id: int, variant: str, fingerprint: str):
+    """
+    Return the stored comparison result for an RFP and variant (options
+    such as weights and narrative) if it was computed from the same
+    proposal set, otherwise None.
+    """
+    stored = (await db.execute(
+        select(ProposalComparisonModel).where(
+            ProposalComparisonModel.rfp_id == rfp_id,
+            ProposalComparisonModel.variant == variant
+        )
+    )).scalars().first()
+    if stored and stored.fingerprint == fingerprint:
+        return stored.result
+    return None
+
+
+async def store_comparison(db: AsyncSession, rfp_id: int, variant: str, fingerprint: str, result: dict) -> None:
+    """
+    Save (or replace) the comparison result for an RFP and variant and
+    commit. A single INSERT ... ON CONFLICT (rfp_id, variant) DO UPDATE,
+    so concurrent first-time comparisons cannot collide on the unique key.
+    """
+    stmt = _dialect_insert(db)(ProposalComparisonModel).values(
+        rfp_id=rfp_id, variant=variant, fingerprint=fingerprint, result=result, created_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProposalComparisonModel.rfp_id, ProposalComparisonModel.variant],
+        set_={"fingerprint": stmt.excluded.fingerprint, "result": stmt.excluded.result}
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def invalidate_comparison(db: AsyncSession, rfp_id: int) -> None:
+    """
+    Drop the stored comparisons (all variants) for an RFP after its proposals change.
+    Does not commit — runs inside the caller's transaction.
+    """
+    await db.execute(
+        delete(ProposalComparisonModel).where(ProposalComparisonModel.rfp_id == rfp_id)
+    )
+
+
+# ======================================================
+# Line items
+# ======================================================
+
+def item_key(name: str) -> str:
+    """Normalized item name: lowercase with whitespace collapsed."""
+    return " ".join(str(name).lower().split())
+
+
+def _to_number(value):
+    """Read a quantity or price that may arrive as text (e.g. "$1,200.00")."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(re.sub(r"[^0-9.\-]", "", str(value)))
+    except ValueError:
+        return None
+
+
+def rfp_line_item_rows(rfp_id: int, items: list) -> list:
+    """Rows for rfp_line_items from an RFP's JSON items (unnamed items are skipped)."""
+    rows = []
+    for position, item in enumerate(items or []):
+        if not isinstance(item, dict) or not item.get("name"):
+            continue
+        rows.append({
+            "rfp_id": rfp_id,
+            "position": position,
+            "name": str(item["name"]),
+            "name_key": item_key(item["name"]),
+            "quantity": _to_number(item.get("quantity")),
+            "specifications": item.get("specifications")
+        })
+    return rows
+
+
+def proposal_line_item_rows(proposal_id: int, rfp_id: int, vendor_id: int, items: list) -> list:
+    """
+    Rows for proposal_line_items from a proposal's JSON items.
+    A missing unit or total price is derived from the other and the quantity.
+    """
+    rows = []
+    for position, item in enumerate(items or []):
+        if not isinstance(item, dict) or not item.get("name"):
+            continue
+        quantity = _to_number(item.get("quantity"))
+        unit_price = _to_number(item.get("unit_price"))
+        total_price = _to_number(item.get("total_price"))
+        if total_price is None and unit_price is not None and quantity is not None:
+            total_price = unit_price * quantity
+        if unit_price is None and total_price is not None and quantity:
+            unit_price = total_price / quantity
+        rows.append({
+            "proposal_id": proposal_id,
+            "rfp_id": rfp_id,
+            "vendor_id": vendor_id,
+            "position": position,
+            "name": str(item["name"]),
+            "name_key": item_key(item["name"]),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_price": total_price
+        })
+    return rows
+
+
+async def sync_rfp_line_items(db: AsyncSession, rfp) -> None:
+    """Replace an RFP's line item rows from RFP.items. Does not commit."""
+    await delete_rfp_line_items(db, rfp.id)
+    rows = rfp_line_item_rows(rfp.id, rfp.items)
+    if rows:
+        await db.execute(insert(RFPLineItemModel), rows)
+
+
+async def delete_rfp_line_items(db: AsyncSession, rfp_id: int) -> None:
+    """Remove an RFP's line item rows. Does not commit."""
+    await db.execute(delete(RFPLineItemModel).where(RFPLineItemModel.rfp_id == rfp_id))
+
+
+async def sync_proposal_line_items(db: AsyncSession, proposal: ProposalModel) -> None:
+    """Replace a proposal's line item rows from Proposal.items. Does not commit."""
+    await db.execute(
+        delete(ProposalLineItemModel).where(ProposalLineItemModel.proposal_id == proposal.id)
+    )
+    rows = proposal_line_item_rows(proposal.id, proposal.rfp_id, proposal.vendor_id, proposal.items)
+    if rows:
+        await db.execute(insert(ProposalLineItemModel), rows)
@@ -5,152 +5,195 @@
 # ------------------------------------------------------
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-from schemas import SendRFPRequest, ReceiveEmailRequest, Proposal
-from database import RFP as RFPModel, Vendor as VendorModel, Proposal as ProposalModel
-from email_service import send_rfp_email
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_read_db, SessionLocal, ReadSessionLocal
+from schemas import SendRFPRequest, ReceiveEmailRequest, ReceiveEmailBatchRequest, Proposal
+from database import RFP as RFPModel, Vendor as VendorModel, Proposal as ProposalModel, OutboundEmail as OutboundEmailModel
+from email_dispatcher import email_dispatcher
+from inbox_service import inbox_poller
 from ai_service import extract_proposal_details
+from ai_rate_limiter import ai_priority, PRIORITY_BATCH
+from repository import invalidate_comparison, upsert_proposal, sync_proposal_line_items
 import re
+import os
+import uuid
+import asyncio
 
 router = APIRouter()
 
+# Maximum number of AI extractions running at once for batch receives,
+# and maximum number of emails in one batch request
+EMAIL_RECEIVE_CONCURRENCY = int(os.getenv("EMAIL_RECEIVE_CONCURRENCY", "5"))
+EMAIL_RECEIVE_MAX_BATCH = int(os.getenv("EMAIL_RECEIVE_MAX_BATCH", "100"))
+
+
 @router.post("/send-rfp")
-async def send_rfp(request: SendRFPRequest, db: Session = Depends(get_db)):
-    """Send an RFP to selected vendors via email"""
+async def send_rfp(request: SendRFPRequest, db: AsyncSession = Depends(get_db)):
+    """Queue an RFP email to each selected vendor; delivery happens in the background"""
 
     # Fetch the RFP from database
-    rfp = db.query(RFPModel).filter(RFPModel.id == request.rfp_id).first()
+    rfp = await db.get(RFPModel, request.rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
     # Fetch all vendors based on selected vendor IDs
-    vendors = db.query(VendorModel).filter(VendorModel.id.in_(request.vendor_ids)).all()
+    vendors = (await db.execute(
+        select(VendorModel).where(VendorModel.id.in_(request.vendor_ids))
+    )).scalars().all()
     if len(vendors) != len(request.vendor_ids):
         raise HTTPException(status_code=404, detail="One or more vendors not found")
     
-    # Prepare the RFP details that will be sent via email
-    rfp_data = {
+    # Enqueue one outbox row per vendor under a shared job id
+    job_id = uuid.uuid4().hex
+    for vendor in vendors:
+        db.add(OutboundEmailModel(
+            job_id=job_id,
+            rfp_id=rfp.id,
+            vendor_id=vendor.id,
+            to_email=vendor.email,
+            vendor_name=vendor.name
+        ))
+    await db.commit()
+
+    # Let the dispatcher pick the new emails up right away
+    email_dispatcher.wake()
+
+    return {"message": "RFP queued for sending", "job_id": job_id, "queued": len(vendors)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_send_job_status(job_id: str, db: AsyncSession = Depends(get_read_db)):
+    """Report per-vendor delivery state for a send-rfp job"""
+
+    emails = (await db.execute(
+        select(OutboundEmailModel).where(OutboundEmailModel.job_id == job_id).order_by(OutboundEmailModel.id)
+    )).scalars().all()
+    if not emails:
+        raise HTTPException(status_code=404, detail="Send job not found")
+
+    # Count emails per delivery state
+    counts = {}
+    for email in emails:
+        counts[email.status] = counts.get(email.status, 0) + 1
+
+    results = []
+    for email in emails:
+        results.append({
+            "vendor_id": email.vendor_id,
+            "vendor_name": email.vendor_name,
+            "status": email.status,
+            "attempts": email.attempts,
+            "error": email.last_error,
+            "next_attempt_at": email.next_attempt_at if email.status == "retrying" else None,
+            "sent_at": email.sent_at
+        })
+
+    return {
+        "job_id": job_id,
+        "rfp_id": emails[0].rfp_id,
+        "completed": all(email.status in ("sent", "failed") for email in emails),
+        "counts": counts,
+        "results": results
+    }
+
+
+def resolve_rfp_id(request: ReceiveEmailRequest):
+    """
+    RFP ID can come directly or be extracted from the subject
+    (e.g., "RFP #10"). Returns None if neither is available.
+    """
+    if request.rfp_id:
+        return request.rfp_id
+    match = re.search(r'RFP[:\s#]*(\d+)', request.subject, re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+
+def rfp_extraction_data(rfp: RFPModel) -> dict:
+    """Prepare data so the AI model knows what the original RFP asked for."""
+    return {
         "title": rfp.title,
-        "description": rfp.description,
         "budget": rfp.budget,
         "delivery_days": rfp.delivery_days,
         "payment_terms": rfp.payment_terms,
         "warranty_required": rfp.warranty_required,
-        "items": rfp.items or [],
-        "requirements": rfp.requirements or []
+        "items": rfp.items or []
     }
-    
-    # Loop through vendors and try sending RFP email to each
-    results = []
-    for vendor in vendors:
-        try:
-            await send_rfp_email(vendor.email, vendor.name, rfp_data)
-            results.append({
-                "vendor_id": vendor.id, 
-                "vendor_name": vendor.name, 
-                "status": "sent"
-            })
-        except Exception as e:
-            # Capture failures per vendor (email issues, SMTP, etc.)
-            results.append({
-                "vendor_id": vendor.id, 
-                "vendor_name": vendor.name, 
-                "status": "failed", 
-                "error": str(e)
-            })
-    
-    # Update RFP status after attempting all emails
-    rfp.status = "sent"
-    db.commit()
-    
-    return {"message": "RFP sending completed", "results": results}
+
+
+def proposal_fields(rfp_id: int, vendor_id: int, body: str, extracted_data: dict) -> dict:
+    """Map AI-extracted data to the columns stored for a proposal."""
+    return {
+        "rfp_id": rfp_id,
+        "vendor_id": vendor_id,
+        "total_price": extracted_data.get("total_price"),
+        "delivery_days": extracted_data.get("delivery_days"),
+        "payment_terms": extracted_data.get("payment_terms"),
+        "warranty": extracted_data.get("warranty"),
+        "items": extracted_data.get("items"),
+        "terms_conditions": extracted_data.get("terms_conditions"),
+        "raw_response": body,
+        "extracted_data": extracted_data,
+        "completeness_score": extracted_data.get("completeness_score", 0)
+    }
+
+
+@router.post("/inbox/poll")
+async def poll_inbox():
+    """Check the configured mailbox for new vendor replies right away"""
+
+    try:
+        return await inbox_poller.poll()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Inbox poll failed: {str(e)}")
 
 
 @router.post("/receive", response_model=Proposal)
-async def receive_vendor_email(request: ReceiveEmailRequest, db: Session = Depends(get_db)):
-    """Receive and parse a vendor email response"""
+async def receive_vendor_email(request: ReceiveEmailRequest):
+    """
+    Receive and parse a vendor email response.
+    No database connection is held during the AI extraction: the RFP and
+    vendor are looked up in one short session, the proposal is written
+    in another.
+    """
 
-    # RFP ID can come directly or extracted from subject/body
-    rfp_id = request.rfp_id
-    
+    rfp_id = resolve_rfp_id(request)
     if not rfp_id:
-        # Try to extract RFP ID from email subject (e.g., "RFP #10")
-        match = re.search(r'RFP[:\s#]*(\d+)', request.subject, re.IGNORECASE)
-        if match:
-            rfp_id = int(match.group(1))
-        else:
-            # No RFP ID provided and not found in subject — stop early
-            raise HTTPException(
-                status_code=400, 
-                detail="RFP ID not found in email. Please specify rfp_id."
-            )
-    
-    # Validate RFP exists
-    rfp = db.query(RFPModel).filter(RFPModel.id == rfp_id).first()
-    if not rfp:
-        raise HTTPException(status_code=404, detail="RFP not found")
+        # No RFP ID provided and not found in subject — stop early
+        raise HTTPException(
+            status_code=400, 
+            detail="RFP ID not found in email. Please specify rfp_id."
+        )
     
-    # Find vendor using sender's email address
-    vendor = db.query(VendorModel).filter(VendorModel.email == request.from_email).first()
+    async with ReadSessionLocal() as db:
+        # Validate RFP exists
+        rfp = await db.get(RFPModel, rfp_id)
+        if not rfp:
+            raise HTTPException(status_code=404, detail="RFP not found")
+
+        # Find vendor using sender's email address
+        vendor = (await db.execute(
+            select(VendorModel).where(VendorModel.email == request.from_email)
+        )).scalars().first()
     if not vendor:
         raise HTTPException(
             status_code=404, 
             detail=f"Vendor with email {request.from_email} not found"
         )
     
-    # Check if vendor already sent a proposal for this RFP
-    existing_proposal = db.query(ProposalModel).filter(
-        ProposalModel.rfp_id == rfp_id,
-        ProposalModel.vendor_id == vendor.id
-    ).first()
-    
-    # Prepare data so the AI model knows what the original RFP asked for
-    rfp_data = {
-        "title": rfp.title,
-        "budget": rfp.budget,
-        "delivery_days": rfp.delivery_days,
-        "payment_terms": rfp.payment_terms,
-        "warranty_required": rfp.warranty_required,
-        "items": rfp.items or []
-    }
-    
     try:
         # Use AI to extract structured proposal details from vendor's email body
-        extracted_data = extract_proposal_details(request.body, rfp_data)
+        extracted_data = await extract_proposal_details(request.body, rfp_extraction_data(rfp))
         
-        # Create a dictionary with fields to store/update in DB
-        proposal_data = {
-            "rfp_id": rfp_id,
-            "vendor_id": vendor.id,
-            "total_price": extracted_data.get("total_price"),
-            "delivery_days": extracted_data.get("delivery_days"),
-            "payment_terms": extracted_data.get("payment_terms"),
-            "warranty": extracted_data.get("warranty"),
-            "items": extracted_data.get("items"),
-            "terms_conditions": extracted_data.get("terms_conditions"),
-            "raw_response": request.body,
-            "extracted_data": extracted_data,
-            "completeness_score": extracted_data.get("completeness_score", 0)
-        }
-        
-        if existing_proposal:
-            # Update existing proposal (vendor replied again)
-            for field, value in proposal_data.items():
-                # Avoid overwriting identifiers
-                if field not in ["rfp_id", "vendor_id"]:
-                    setattr(existing_proposal, field, value)
-            db.commit()
-            db.refresh(existing_proposal)
-            return existing_proposal
-        
-        else:
-            # Create a brand-new proposal record
-            db_proposal = ProposalModel(**proposal_data)
-            db.add(db_proposal)
-            db.commit()
-            db.refresh(db_proposal)
-            return db_proposal
+        # Create the proposal, or update it if the vendor replied again,
+        # in one atomic upsert; then drop the RFP's stale comparison
+        async with SessionLocal() as db:
+            db_proposal = await upsert_proposal(db, proposal_fields(rfp_id, vendor.id, request.body, extracted_data))
+            await sync_proposal_line_items(db, db_proposal)
+            await invalidate_comparison(db, rfp_id)
+            await db.commit()
+            await db.refresh(db_proposal)
+        return db_proposal
             
     except Exception as e:
         # Any parsing/AI error is surfaced as a 500
@@ -158,3 +201,111 @@ async def receive_vendor_email(request: ReceiveEmailRequest, db: Session = Depen
             status_code=500, 
             detail=f"Failed to parse email: {str(e)}"
         )
+
+
+@router.post("/receive-batch")
+async def receive_vendor_emails_batch(request: ReceiveEmailBatchRequest):
+    """
+    Receive and parse many vendor email responses at once (at most
+    EMAIL_RECEIVE_MAX_BATCH). RFPs and vendors are loaded with one query
+    each, AI extractions run concurrently (bounded by
+    EMAIL_RECEIVE_CONCURRENCY) with no database connection held, and all
+    proposals are written in a single transaction. Returns one result
+    per email.
+    """
+
+    emails = request.emails
+    if len(emails) > EMAIL_RECEIVE_MAX_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many emails in one batch ({len(emails)}); the maximum is {EMAIL_RECEIVE_MAX_BATCH}"
+        )
+    results = [{"index": index, "from_email": email.from_email} for index, email in enumerate(emails)]
+    rfp_ids = [resolve_rfp_id(email) for email in emails]
+
+    # Resolve all referenced RFPs and vendors with one query each
+    wanted_rfp_ids = {rfp_id for rfp_id in rfp_ids if rfp_id}
+    sender_emails = {email.from_email for email in emails}
+    rfps, vendors = {}, {}
+    async with ReadSessionLocal() as db:
+        if wanted_rfp_ids:
+            rfps = {
+                rfp.id: rfp
+                for rfp in (await db.execute(select(RFPModel).where(RFPModel.id.in_(wanted_rfp_ids)))).scalars()
+            }
+        if sender_emails:
+            vendors = {
+                vendor.email: vendor
+                for vendor in (await db.execute(select(VendorModel).where(VendorModel.email.in_(sender_emails)))).scalars()
+            }
+
+    # Work out which emails can be processed
+    pending = []
+    for index, (email, rfp_id) in enumerate(zip(emails, rfp_ids)):
+        result = results[index]
+        if not rfp_id:
+            result.update(status="failed", error="RFP ID not found in email. Please specify rfp_id.")
+        elif rfp_id not in rfps:
+            result.update(status="failed", error="RFP not found")
+        elif email.from_email not in vendors:
+            result.update(status="failed", error=f"Vendor with email {email.from_email} not found")
+        else:
+            pending.append((index, email, rfps[rfp_id], vendors[email.from_email]))
+
+    # Run AI extractions concurrently under a concurrency limit
+    semaphore = asyncio.Semaphore(EMAIL_RECEIVE_CONCURRENCY)
+
+    async def extract(email: ReceiveEmailRequest, rfp: RFPModel):
+        async with semaphore:
+            try:
+                # Batch work yields to interactive AI calls under the rate limits
+                with ai_priority(PRIORITY_BATCH):
+                    return await extract_proposal_details(email.body, rfp_extraction_data(rfp))
+            except Exception as e:
+                return e
+
+    extractions = await asyncio.gather(*(extract(email, rfp) for _, email, rfp, _ in pending))
+
+    # Write every successful extraction in one transaction (in input order,
+    # so a later reply from the same vendor wins)
+    written = []
+    async with SessionLocal() as db:
+        # Find which (rfp, vendor) pairs already have a proposal, in one query
+        # (used to report "created" vs "updated")
+        existing = set()
+        if pending:
+            pairs = {(rfp.id, vendor.id) for _, _, rfp, vendor in pending}
+            rows = await db.execute(
+                select(ProposalModel.rfp_id, ProposalModel.vendor_id).where(
+                    ProposalModel.rfp_id.in_({rfp_id for rfp_id, _ in pairs}),
+                    ProposalModel.vendor_id.in_({vendor_id for _, vendor_id in pairs})
+                )
+            )
+            existing = {(rfp_id, vendor_id) for rfp_id, vendor_id in rows if (rfp_id, vendor_id) in pairs}
+
+        touched_rfp_ids = set()
+        for (index, email, rfp, vendor), extracted_data in zip(pending, extractions):
+            if isinstance(extracted_data, Exception):
+                results[index].update(status="failed", error=f"Failed to parse email: {str(extracted_data)}")
+                continue
+            key = (rfp.id, vendor.id)
+            results[index]["status"] = "updated" if key in existing else "created"
+            existing.add(key)
+            db_proposal = await upsert_proposal(db, proposal_fields(rfp.id, vendor.id, email.body, extracted_data))
+            await sync_proposal_line_items(db, db_proposal)
+            written.append((index, db_proposal))
+            touched_rfp_ids.add(rfp.id)
+
+        for rfp_id in touched_rfp_ids:
+            await invalidate_comparison(db, rfp_id)
+        await db.commit()
+
+    for index, db_proposal in written:
+        results[index]["proposal_id"] = db_proposal.id
+
+    # Summarize outcome counts
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    return {"counts": counts, "results": results}
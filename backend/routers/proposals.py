@@ -4,58 +4,143 @@
 # Used after vendor responses are parsed or manually added.
 # ------------------------------------------------------
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload
+from typing import List, Optional
+from database import get_db, get_read_db, SessionLocal
 from schemas import Proposal, ProposalCreate, ProposalUpdate, ProposalWithVendor, ComparisonResult
+from schemas import ProposalLineItem, LineItemPriceSummary
 from database import Proposal as ProposalModel, RFP as RFPModel, Vendor as VendorModel
-from ai_service import compare_proposals_and_recommend
+from database import ProposalLineItem as ProposalLineItemModel
+from ai_service import write_comparison_narrative, stream_comparison_narrative
+from sse import sse_event, sse_response
+from scoring import score_proposals, normalize_weights
+from pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from repository import upsert_proposal, proposal_set_fingerprint, get_stored_comparison, store_comparison, invalidate_comparison, sync_proposal_line_items, item_key
 
 router = APIRouter()
 
 @router.post("/", response_model=Proposal)
-async def create_proposal(proposal: ProposalCreate, db: Session = Depends(get_db)):
+async def create_proposal(proposal: ProposalCreate, db: AsyncSession = Depends(get_db)):
     """Create a proposal (usually from email parsing)"""
 
     # Ensure the referenced RFP exists
-    rfp = db.query(RFPModel).filter(RFPModel.id == proposal.rfp_id).first()
+    rfp = await db.get(RFPModel, proposal.rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
     # Ensure the vendor exists
-    vendor = db.query(VendorModel).filter(VendorModel.id == proposal.vendor_id).first()
+    vendor = await db.get(VendorModel, proposal.vendor_id)
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
     
-    # Create the proposal record
-    db_proposal = ProposalModel(**proposal.dict())
-    db.add(db_proposal)
-    db.commit()
-    db.refresh(db_proposal)
+    # Create the proposal record (or update the vendor's existing one)
+    # Only the fields sent are written, so a re-post keeps the others
+    db_proposal = await upsert_proposal(db, proposal.dict(exclude_unset=True))
+    await sync_proposal_line_items(db, db_proposal)
+
+    # The RFP's proposal set changed, so its stored comparison is stale
+    await invalidate_comparison(db, proposal.rfp_id)
+    await db.commit()
+    await db.refresh(db_proposal)
     return db_proposal
 
 
 @router.get("/", response_model=List[ProposalWithVendor])
-async def list_proposals(rfp_id: int = None, db: Session = Depends(get_db)):
-    """List all proposals, optionally filtered by RFP"""
+async def list_proposals(
+    response: Response,
+    rfp_id: int = None,
+    vendor_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List proposals one page at a time, optionally filtered by RFP, vendor and price range"""
+
+    # Begin querying proposals; vendors are loaded in one extra query
+    # instead of lazily per proposal during serialization
+    query = select(ProposalModel).options(selectinload(ProposalModel.vendor))
+
+    # Apply optional filters
+    if rfp_id:
+        query = query.where(ProposalModel.rfp_id == rfp_id)
+    if vendor_id:
+        query = query.where(ProposalModel.vendor_id == vendor_id)
+    if min_price is not None:
+        query = query.where(ProposalModel.total_price >= min_price)
+    if max_price is not None:
+        query = query.where(ProposalModel.total_price <= max_price)
+
+    return await paginate(db, query, ProposalModel, response, limit, cursor, sort)
+
+
+@router.get("/line-items", response_model=List[ProposalLineItem])
+async def list_line_items(
+    item: Optional[str] = None,
+    rfp_id: Optional[int] = None,
+    vendor_id: Optional[int] = None,
+    min_unit_price: Optional[float] = None,
+    max_unit_price: Optional[float] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List quoted line items, cheapest first (e.g. all quotes for an item under a unit price)"""
+
+    query = select(ProposalLineItemModel)
+
+    # Item names are matched case- and whitespace-insensitively
+    if item:
+        query = query.where(ProposalLineItemModel.name_key == item_key(item))
+    if rfp_id:
+        query = query.where(ProposalLineItemModel.rfp_id == rfp_id)
+    if vendor_id:
+        query = query.where(ProposalLineItemModel.vendor_id == vendor_id)
+    if min_unit_price is not None:
+        query = query.where(ProposalLineItemModel.unit_price >= min_unit_price)
+    if max_unit_price is not None:
+        query = query.where(ProposalLineItemModel.unit_price <= max_unit_price)
+
+    query = query.order_by(ProposalLineItemModel.unit_price, ProposalLineItemModel.id).limit(limit)
+    return (await db.execute(query)).scalars().all()
+
 
-    # Begin querying proposals
-    query = db.query(ProposalModel)
+@router.get("/line-items/summary", response_model=List[LineItemPriceSummary])
+async def summarize_line_items(
+    rfp_id: Optional[int] = None,
+    item: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Unit price statistics per item across vendors, computed in SQL"""
+
+    query = select(
+        func.min(ProposalLineItemModel.name).label("item"),
+        func.count(ProposalLineItemModel.id).label("quotes"),
+        func.count(func.distinct(ProposalLineItemModel.vendor_id)).label("vendors"),
+        func.sum(ProposalLineItemModel.quantity).label("total_quantity"),
+        func.avg(ProposalLineItemModel.unit_price).label("avg_unit_price"),
+        func.min(ProposalLineItemModel.unit_price).label("min_unit_price"),
+        func.max(ProposalLineItemModel.unit_price).label("max_unit_price")
+    ).group_by(ProposalLineItemModel.name_key).order_by(ProposalLineItemModel.name_key)
 
-    # If rfp_id is provided, filter by RFP
     if rfp_id:
-        query = query.filter(ProposalModel.rfp_id == rfp_id)
+        query = query.where(ProposalLineItemModel.rfp_id == rfp_id)
+    if item:
+        query = query.where(ProposalLineItemModel.name_key == item_key(item))
 
-    return query.all()
+    return [dict(row._mapping) for row in await db.execute(query)]
 
 
 @router.get("/{proposal_id}", response_model=ProposalWithVendor)
-async def get_proposal(proposal_id: int, db: Session = Depends(get_db)):
+async def get_proposal(proposal_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a specific proposal"""
 
-    # Fetch the proposal by ID
-    proposal = db.query(ProposalModel).filter(ProposalModel.id == proposal_id).first()
+    # Fetch the proposal by ID together with its vendor
+    proposal = await db.get(ProposalModel, proposal_id, options=[joinedload(ProposalModel.vendor)])
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
@@ -63,11 +148,11 @@ async def get_proposal(proposal_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{proposal_id}", response_model=Proposal)
-async def update_proposal(proposal_id: int, proposal_update: ProposalUpdate, db: Session = Depends(get_db)):
+async def update_proposal(proposal_id: int, proposal_update: ProposalUpdate, db: AsyncSession = Depends(get_db)):
     """Update a proposal"""
 
     # Fetch the proposal
-    proposal = db.query(ProposalModel).filter(ProposalModel.id == proposal_id).first()
+    proposal = await db.get(ProposalModel, proposal_id)
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
@@ -75,30 +160,37 @@ async def update_proposal(proposal_id: int, proposal_update: ProposalUpdate, db:
     update_data = proposal_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(proposal, field, value)
-    
-    db.commit()
-    db.refresh(proposal)
+    if "items" in update_data:
+        await sync_proposal_line_items(db, proposal)
+
+    await invalidate_comparison(db, proposal.rfp_id)
+    await db.commit()
+    await db.refresh(proposal)
     return proposal
 
 
-@router.get("/rfp/{rfp_id}/compare", response_model=ComparisonResult)
-async def compare_proposals(rfp_id: int, db: Session = Depends(get_db)):
-    """Compare proposals for a given RFP and get AI recommendations"""
+async def load_comparison_inputs(db: AsyncSession, rfp_id: int, narrative: bool, weights: dict):
+    """
+    Load an RFP and its proposals for comparison.
+    Returns (variant, fingerprint, stored result or None, rfp_data, proposals_data).
+    """
 
     # Validate RFP exists
-    rfp = db.query(RFPModel).filter(RFPModel.id == rfp_id).first()
+    rfp = await db.get(RFPModel, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
-    # Fetch all proposals for this RFP
-    proposals = db.query(ProposalModel).filter(ProposalModel.rfp_id == rfp_id).all()
+    # Fetch all proposals for this RFP with their vendors (no per-proposal lookups)
+    proposals = (await db.execute(
+        select(ProposalModel).options(selectinload(ProposalModel.vendor)).where(ProposalModel.rfp_id == rfp_id)
+    )).scalars().all()
     if not proposals:
         raise HTTPException(status_code=404, detail="No proposals found for this RFP")
-    
-    # Build structured data the AI model can compare
+
+    # Build structured data to score (and for the AI narrative)
     proposals_data = []
     for prop in proposals:
-        vendor = db.query(VendorModel).filter(VendorModel.id == prop.vendor_id).first()
+        vendor = prop.vendor
         proposals_data.append({
             "vendor_name": vendor.name if vendor else "Unknown",
             "total_price": prop.total_price,
@@ -118,13 +210,100 @@ async def compare_proposals(rfp_id: int, db: Session = Depends(get_db)):
         "warranty_required": rfp.warranty_required,
         "items": rfp.items or []
     }
-    
-    # Use AI to compare proposals and recommend the best option
+
+    # Reuse the stored comparison for these options if neither the proposals
+    # nor the RFP changed since
+    variant = f"narrative={narrative};" + ",".join(f"{name}={weight:.6f}" for name, weight in weights.items())
+    fingerprint = proposal_set_fingerprint(proposals, rfp_data)
+    stored_result = await get_stored_comparison(db, rfp_id, variant, fingerprint)
+    return variant, fingerprint, stored_result, rfp_data, proposals_data
+
+
+def resolve_weights(weight_price: Optional[float], weight_delivery: Optional[float], weight_completeness: Optional[float]) -> dict:
+    """Score weights from query overrides, then environment defaults (400 if invalid)."""
     try:
-        comparison_result = compare_proposals_and_recommend(rfp_data, proposals_data)
-        return comparison_result
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Failed to compare proposals: {str(e)}"
-        )
+        return normalize_weights({
+            "price": weight_price,
+            "delivery": weight_delivery,
+            "completeness": weight_completeness
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/rfp/{rfp_id}/compare", response_model=ComparisonResult)
+async def compare_proposals(
+    rfp_id: int,
+    narrative: bool = False,
+    weight_price: Optional[float] = None,
+    weight_delivery: Optional[float] = None,
+    weight_completeness: Optional[float] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Score and rank proposals for a given RFP locally; with narrative=true
+    the AI also writes the strengths/weaknesses and recommendation text
+    """
+    weights = resolve_weights(weight_price, weight_delivery, weight_completeness)
+    variant, fingerprint, stored_result, rfp_data, proposals_data = await load_comparison_inputs(db, rfp_id, narrative, weights)
+    if stored_result is not None:
+        return stored_result
+
+    # Scores, ranks and the recommended vendor are computed locally
+    comparison_result = score_proposals(rfp_data, proposals_data, weights)
+
+    # Optionally let the AI describe the result in its own words
+    if narrative:
+        try:
+            comparison_result = await write_comparison_narrative(rfp_data, proposals_data, comparison_result)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Failed to compare proposals: {str(e)}"
+            )
+
+    # Persist the result for repeat views of this RFP
+    await store_comparison(db, rfp_id, variant, fingerprint, comparison_result)
+    return comparison_result
+
+
+@router.get("/rfp/{rfp_id}/compare/stream")
+async def compare_proposals_stream(
+    rfp_id: int,
+    weight_price: Optional[float] = None,
+    weight_delivery: Optional[float] = None,
+    weight_completeness: Optional[float] = None
+):
+    """
+    Streaming comparison with AI narrative (Server-Sent Events): a "scores"
+    event with the locally computed result comes first, then "token" events
+    while the AI writes, then the validated and saved "result" (or "error")
+    """
+    weights = resolve_weights(weight_price, weight_delivery, weight_completeness)
+
+    # Short session: no connection is held while the narrative streams
+    async with SessionLocal() as db:
+        variant, fingerprint, stored_result, rfp_data, proposals_data = await load_comparison_inputs(db, rfp_id, True, weights)
+
+    async def events():
+        if stored_result is not None:
+            yield sse_event("result", stored_result)
+            return
+
+        scored = score_proposals(rfp_data, proposals_data, weights)
+        yield sse_event("scores", scored)
+        try:
+            async for kind, value in stream_comparison_narrative(rfp_data, proposals_data, scored):
+                if kind == "token":
+                    yield sse_event("token", {"text": value})
+                    continue
+
+                # Narrative finished: validate, then persist for repeat views
+                result = ComparisonResult(**value).model_dump()
+                async with SessionLocal() as write_db:
+                    await store_comparison(write_db, rfp_id, variant, fingerprint, result)
+                yield sse_event("result", result)
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Failed to compare proposals: {str(e)}"})
+
+    return sse_response(events())
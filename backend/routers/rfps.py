@@ -4,66 +4,114 @@
 # It handles creating, reading, updating, deleting, and AI parsing.
 # ------------------------------------------------------
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import get_db, get_read_db, SessionLocal
 from schemas import RFP, RFPCreate, RFPCreateFromText, RFPUpdate
 from database import RFP as RFPModel
-from ai_service import parse_natural_language_to_rfp
+from ai_service import parse_natural_language_to_rfp, stream_natural_language_to_rfp
+from sse import sse_event, sse_response
+from repository import invalidate_comparison, sync_rfp_line_items, delete_rfp_line_items
+from pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
 
+async def save_parsed_rfp(db: AsyncSession, parsed_data: dict) -> RFPModel:
+    """Validate AI-parsed RFP fields and insert the RFP (with its line items)."""
+
+    # Convert parsed AI result into proper schema for DB insertion
+    rfp_data = RFPCreate(**parsed_data)
+
+    # Insert new RFP into database
+    db_rfp = RFPModel(**rfp_data.dict())
+    db.add(db_rfp)
+    await db.flush()
+    await sync_rfp_line_items(db, db_rfp)
+    await db.commit()
+    await db.refresh(db_rfp)
+    return db_rfp
+
+
 @router.post("/from-text", response_model=RFP)
-async def create_rfp_from_text(request: RFPCreateFromText, db: Session = Depends(get_db)):
+async def create_rfp_from_text(request: RFPCreateFromText, db: AsyncSession = Depends(get_db)):
     """Create an RFP from natural language input"""
 
     try:
         # Use AI to convert messy natural text into structured RFP fields
-        parsed_data = parse_natural_language_to_rfp(request.text)
-        
-        # Convert parsed AI result into proper schema for DB insertion
-        rfp_data = RFPCreate(**parsed_data)
-
-        # Insert new RFP into database
-        db_rfp = RFPModel(**rfp_data.dict())
-        db.add(db_rfp)
-        db.commit()
-        db.refresh(db_rfp)
-        return db_rfp
+        parsed_data = await parse_natural_language_to_rfp(request.text)
+        return await save_parsed_rfp(db, parsed_data)
 
     except Exception as e:
         # Any parsing or validation error returns a user-friendly message
         raise HTTPException(status_code=400, detail=f"Failed to create RFP: {str(e)}")
 
 
+@router.post("/from-text/stream")
+async def create_rfp_from_text_stream(request: RFPCreateFromText):
+    """
+    Streaming variant of /from-text (Server-Sent Events): "token" events
+    carry the model output as it is generated, then a "result" event
+    carries the saved RFP (or an "error" event)
+    """
+
+    async def events():
+        try:
+            async for kind, value in stream_natural_language_to_rfp(request.text):
+                if kind == "token":
+                    yield sse_event("token", {"text": value})
+                    continue
+
+                # Model finished: validate and persist the RFP
+                async with SessionLocal() as db:
+                    db_rfp = await save_parsed_rfp(db, value)
+                yield sse_event("result", RFP.model_validate(db_rfp))
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Failed to create RFP: {str(e)}"})
+
+    return sse_response(events())
+
+
 @router.post("/", response_model=RFP)
-async def create_rfp(rfp: RFPCreate, db: Session = Depends(get_db)):
+async def create_rfp(rfp: RFPCreate, db: AsyncSession = Depends(get_db)):
     """Create an RFP manually"""
 
     # Directly store the provided structured RFP data
     db_rfp = RFPModel(**rfp.dict())
     db.add(db_rfp)
-    db.commit()
-    db.refresh(db_rfp)
+    await db.flush()
+    await sync_rfp_line_items(db, db_rfp)
+    await db.commit()
+    await db.refresh(db_rfp)
     return db_rfp
 
 
 @router.get("/", response_model=List[RFP])
-async def list_rfps(db: Session = Depends(get_db)):
-    """List all RFPs"""
+async def list_rfps(
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "-created_at",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List RFPs one page at a time (newest first by default), optionally filtered by status"""
 
-    # Get all RFPs sorted by newest first
-    return db.query(RFPModel).order_by(RFPModel.created_at.desc()).all()
+    query = select(RFPModel)
+    if status:
+        query = query.where(RFPModel.status == status)
+
+    return await paginate(db, query, RFPModel, response, limit, cursor, sort)
 
 
 @router.get("/{rfp_id}", response_model=RFP)
-async def get_rfp(rfp_id: int, db: Session = Depends(get_db)):
+async def get_rfp(rfp_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a specific RFP"""
 
     # Fetch RFP by ID
-    rfp = db.query(RFPModel).filter(RFPModel.id == rfp_id).first()
+    rfp = await db.get(RFPModel, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
 
@@ -71,11 +119,11 @@ async def get_rfp(rfp_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{rfp_id}", response_model=RFP)
-async def update_rfp(rfp_id: int, rfp_update: RFPUpdate, db: Session = Depends(get_db)):
+async def update_rfp(rfp_id: int, rfp_update: RFPUpdate, db: AsyncSession = Depends(get_db)):
     """Update an RFP"""
 
     # Ensure RFP exists
-    rfp = db.query(RFPModel).filter(RFPModel.id == rfp_id).first()
+    rfp = await db.get(RFPModel, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
@@ -83,23 +131,29 @@ async def update_rfp(rfp_id: int, rfp_update: RFPUpdate, db: Session = Depends(g
     update_data = rfp_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(rfp, field, value)
-    
-    db.commit()
-    db.refresh(rfp)
+    if "items" in update_data:
+        await sync_rfp_line_items(db, rfp)
+
+    # Scores depend on the RFP (budget, delivery days), so drop stored comparisons
+    await invalidate_comparison(db, rfp_id)
+    await db.commit()
+    await db.refresh(rfp)
     return rfp
 
 
 @router.delete("/{rfp_id}")
-async def delete_rfp(rfp_id: int, db: Session = Depends(get_db)):
+async def delete_rfp(rfp_id: int, db: AsyncSession = Depends(get_db)):
     """Delete an RFP"""
 
     # Check whether RFP exists
-    rfp = db.query(RFPModel).filter(RFPModel.id == rfp_id).first()
+    rfp = await db.get(RFPModel, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
-    # Remove the RFP from the database
-    db.delete(rfp)
-    db.commit()
+    # Remove the RFP (and its stored comparison and line items) from the database
+    await invalidate_comparison(db, rfp_id)
+    await delete_rfp_line_items(db, rfp_id)
+    await db.delete(rfp)
+    await db.commit()
 
     return {"message": "RFP deleted successfully"}
@@ -4,43 +4,57 @@
 # Provides endpoints to create, list, update, and delete vendor records.
 # ------------------------------------------------------
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import get_db, get_read_db
 from schemas import Vendor, VendorCreate, VendorUpdate
 from database import Vendor as VendorModel
+from pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
 
 @router.post("/", response_model=Vendor)
-async def create_vendor(vendor: VendorCreate, db: Session = Depends(get_db)):
+async def create_vendor(vendor: VendorCreate, db: AsyncSession = Depends(get_db)):
     """Create a new vendor"""
 
     # Create vendor record from request schema
     db_vendor = VendorModel(**vendor.dict())
     db.add(db_vendor)
-    db.commit()
-    db.refresh(db_vendor)
+    await db.commit()
+    await db.refresh(db_vendor)
 
     return db_vendor
 
 
 @router.get("/", response_model=List[Vendor])
-async def list_vendors(db: Session = Depends(get_db)):
-    """List all vendors"""
+async def list_vendors(
+    response: Response,
+    name_prefix: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List vendors one page at a time, optionally filtered by name prefix"""
 
-    # Retrieve all vendors from database
-    return db.query(VendorModel).all()
+    query = select(VendorModel)
+    if name_prefix:
+        # Escape LIKE wildcards so the prefix is matched literally
+        escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(VendorModel.name.ilike(f"{escaped}%", escape="\\"))
+
+    return await paginate(db, query, VendorModel, response, limit, cursor, sort)
 
 
 @router.get("/{vendor_id}", response_model=Vendor)
-async def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
+async def get_vendor(vendor_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a specific vendor"""
 
     # Find vendor by primary key
-    vendor = db.query(VendorModel).filter(VendorModel.id == vendor_id).first()
+    vendor = await db.get(VendorModel, vendor_id)
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
 
@@ -48,11 +62,11 @@ async def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{vendor_id}", response_model=Vendor)
-async def update_vendor(vendor_id: int, vendor_update: VendorUpdate, db: Session = Depends(get_db)):
+async def update_vendor(vendor_id: int, vendor_update: VendorUpdate, db: AsyncSession = Depends(get_db)):
     """Update a vendor"""
 
     # Ensure vendor exists before updating
-    vendor = db.query(VendorModel).filter(VendorModel.id == vendor_id).first()
+    vendor = await db.get(VendorModel, vendor_id)
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
     
@@ -61,21 +75,21 @@ async def update_vendor(vendor_id: int, vendor_update: VendorUpdate, db: Session
     for field, value in update_data.items():
         setattr(vendor, field, value)
 
-    db.commit()
-    db.refresh(vendor)
+    await db.commit()
+    await db.refresh(vendor)
     return vendor
 
 
 @router.delete("/{vendor_id}")
-async def delete_vendor(vendor_id: int, db: Session = Depends(get_db)):
+async def delete_vendor(vendor_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a vendor"""
 
     # Attempt to find vendor before deleting
-    vendor = db.query(VendorModel).filter(VendorModel.id == vendor_id).first()
+    vendor = await db.get(VendorModel, vendor_id)
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
     
-    db.delete(vendor)
-    db.commit()
+    await db.delete(vendor)
+    await db.commit()
 
     return {"message": "Vendor deleted successfully"}
@@ -193,6 +193,36 @@ class ProposalWithVendor(Proposal):
         from_attributes = True
 
 
+class ProposalLineItem(BaseModel):
+    """
+    One item quoted in a proposal, normalized from Proposal.items.
+    """
+    id: int
+    proposal_id: int
+    rfp_id: int
+    vendor_id: int
+    name: str
+    quantity: Optional[float] = None
+    unit_price: Optional[float] = None
+    total_price: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LineItemPriceSummary(BaseModel):
+    """
+    Price statistics for one item across all proposals that quote it.
+    """
+    item: str
+    quotes: int
+    vendors: int
+    total_quantity: Optional[float] = None
+    avg_unit_price: Optional[float] = None
+    min_unit_price: Optional[float] = None
+    max_unit_price: Optional[float] = None
+
+
 # ======================================================
 # Email Request Schemas
 # ======================================================
@@ -216,6 +246,14 @@ class ReceiveEmailRequest(BaseModel):
     rfp_id: Optional[int] = None
 
 
+class ReceiveEmailBatchRequest(BaseModel):
+    """
+    Schema used when receiving many vendor emails in one call,
+    e.g. after an RFP deadline.
+    """
+    emails: List[ReceiveEmailRequest]
+
+
 # ======================================================
 # AI Comparison Schemas
 # ======================================================
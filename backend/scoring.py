@@ -0,0 +1,145 @@
+# ------------------------------------------------------
+# This module scores and ranks the proposals of an RFP locally.
+# Price, delivery and completeness are plain arithmetic, so the
+# scores, ranks and a rule-based recommendation are computed
+# here in one pass instead of by the LLM. The LLM is only asked
+# (optionally) for narrative strengths/weaknesses and wording.
+# ------------------------------------------------------
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Default weight of each criterion in the overall score (normalized to sum to 1)
+DEFAULT_WEIGHTS = {
+    "price": float(os.getenv("SCORE_WEIGHT_PRICE", "0.4")),
+    "delivery": float(os.getenv("SCORE_WEIGHT_DELIVERY", "0.3")),
+    "completeness": float(os.getenv("SCORE_WEIGHT_COMPLETENESS", "0.3"))
+}
+
+
+def normalize_weights(weights: dict = None) -> dict:
+    """
+    Merge weights over the defaults and scale them to sum to 1.
+    Raises ValueError for negative weights or an all-zero set.
+    """
+    merged = dict(DEFAULT_WEIGHTS)
+    merged.update({name: value for name, value in (weights or {}).items() if value is not None})
+
+    unknown = set(merged) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown score weights: {', '.join(sorted(unknown))}")
+    if any(value < 0 for value in merged.values()):
+        raise ValueError("Score weights must not be negative")
+    total = sum(merged.values())
+    if total <= 0:
+        raise ValueError("At least one score weight must be positive")
+    return {name: value / total for name, value in merged.items()}
+
+
+def _positive(value):
+    """Treat missing, zero or negative prices/delivery times as not quoted."""
+    return float(value) if isinstance(value, (int, float)) and value > 0 else None
+
+
+def _ratio_scores(values: list) -> list:
+    """Lower is better: best value scores 1, others best/value; missing scores 0."""
+    quoted = [value for value in values if value is not None]
+    if not quoted:
+        return [0.0] * len(values)
+    best = min(quoted)
+    return [best / value if value is not None else 0.0 for value in values]
+
+
+def _ranks(values: list) -> list:
+    """Competition ranks (1, 1, 3 ...) with lower values first and missing values last."""
+    keyed = [(value is None, value if value is not None else 0.0) for value in values]
+    return [1 + sum(1 for other in keyed if other < key) for key in keyed]
+
+
+def score_proposals(rfp_data: dict, proposals: list, weights: dict = None) -> dict:
+    """
+    Score and rank proposals (dicts with vendor_name, total_price,
+    delivery_days, completeness_score) and return a ComparisonResult.
+    Scores are 0-100. Comparisons are listed best first.
+    """
+    weights = normalize_weights(weights)
+
+    # Column-wise pass: extract each criterion once, then score all proposals
+    prices = [_positive(prop.get("total_price")) for prop in proposals]
+    deliveries = [_positive(prop.get("delivery_days")) for prop in proposals]
+    completeness = [
+        min(max(float(prop.get("completeness_score") or 0), 0.0), 1.0) for prop in proposals
+    ]
+    price_scores = _ratio_scores(prices)
+    delivery_scores = _ratio_scores(deliveries)
+    price_ranks = _ranks(prices)
+    delivery_ranks = _ranks(deliveries)
+    scores = [
+        round(100 * (
+            weights["price"] * price_score
+            + weights["delivery"] * delivery_score
+            + weights["completeness"] * complete
+        ), 1)
+        for price_score, delivery_score, complete in zip(price_scores, delivery_scores, completeness)
+    ]
+
+    budget = _positive(rfp_data.get("budget"))
+    required_days = _positive(rfp_data.get("delivery_days"))
+
+    comparison = []
+    for index, prop in enumerate(proposals):
+        strengths, weaknesses = [], []
+        price, days, complete = prices[index], deliveries[index], completeness[index]
+
+        if price is None:
+            weaknesses.append("No total price quoted")
+        elif price_ranks[index] == 1:
+            strengths.append("Best price")
+        if price is not None and budget is not None:
+            if price <= budget:
+                strengths.append("Within budget")
+            else:
+                weaknesses.append(f"Over budget by ${price - budget:,.2f}")
+
+        if days is None:
+            weaknesses.append("No delivery time quoted")
+        elif delivery_ranks[index] == 1:
+            strengths.append("Fastest delivery")
+        if days is not None and required_days is not None:
+            if days <= required_days:
+                strengths.append("Meets delivery requirement")
+            else:
+                weaknesses.append(f"Delivery {days - required_days:g} days later than required")
+
+        if complete >= 0.9:
+            strengths.append("Complete response")
+        elif complete < 0.6:
+            weaknesses.append(f"Incomplete response ({complete:.0%})")
+
+        comparison.append({
+            "vendor_name": prop.get("vendor_name", "Unknown"),
+            "score": scores[index],
+            "strengths": strengths,
+            "weaknesses": weaknesses,
+            "price_rank": price_ranks[index],
+            "delivery_rank": delivery_ranks[index]
+        })
+
+    # Best first; ties keep proposal order
+    comparison.sort(key=lambda comp: -comp["score"])
+    best = comparison[0]
+
+    criteria = ", ".join(f"{name} ({weight:.0%})" for name, weight in weights.items())
+    reason = f"{best['vendor_name']} has the highest weighted score ({best['score']:.1f}/100)"
+    if best["strengths"]:
+        reason += ": " + ", ".join(strength.lower() for strength in best["strengths"])
+    return {
+        "comparison": comparison,
+        "recommendation": {
+            "recommended_vendor": best["vendor_name"],
+            "reason": reason + ".",
+            "summary": f"{len(proposals)} proposals scored on {criteria}."
+        }
+    }
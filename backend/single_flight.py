@@ -0,0 +1,106 @@
+# ------------------------------------------------------
+# This module coalesces identical in-flight AI calls.
+# Concurrent requests with the same key (the AI cache key)
+# share one model call and all receive its result, so several
+# managers opening the same comparison, or a double-submitted
+# form, cost a single call. Streams register themselves too,
+# so an identical stream or blocking call waits for their result.
+# ------------------------------------------------------
+
+import copy
+import asyncio
+
+
+class FlightAbandoned(Exception):
+    """The caller running a flight stopped before it had a result."""
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. The call runs as its own
+    task, so a caller that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, call):
+        """
+        Await `call()` for this key, or join the call already in flight.
+        Every caller gets its own copy of the result; errors are shared too.
+        """
+        while True:
+            task = self._in_flight.get(key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                self.calls += 1
+                task = asyncio.ensure_future(call())
+                self._track(key, task)
+
+            try:
+                result = await asyncio.shield(task)
+            except FlightAbandoned:
+                # The stream we joined was closed early: run (or join) again
+                continue
+            return copy.deepcopy(result)
+
+    def join(self, key: str):
+        """
+        Awaitable for the call in flight for `key`, or None if there is none.
+        Raises FlightAbandoned if that call was a stream closed before finishing.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            return None
+        self.coalesced += 1
+        return self._copy_result(task)
+
+    def start(self, key: str):
+        """
+        Register a call the caller runs itself (such as a stream) and return
+        its flight. Until finish() or fail() is called, run() and join() for
+        the key wait for it. Check join() first: start() replaces any flight.
+        """
+        self.calls += 1
+        flight = asyncio.get_running_loop().create_future()
+        self._track(key, flight)
+        return flight
+
+    def finish(self, flight, result) -> None:
+        """Hand the result of a started flight (a copy of it) to everyone waiting."""
+        if not flight.done():
+            flight.set_result(copy.deepcopy(result))
+
+    def fail(self, flight, error: BaseException) -> None:
+        """End a started flight with an error (no-op if it already ended)."""
+        if not flight.done():
+            flight.set_exception(error)
+
+    def stats(self) -> dict:
+        """Calls started, callers that joined an existing call, and calls in flight."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
+
+    async def _copy_result(self, task):
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _track(self, key: str, task) -> None:
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+
+    def _finish(self, key: str, task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the error as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+
+# Shared instance used by ai_service
+ai_single_flight = SingleFlight()
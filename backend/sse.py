@@ -0,0 +1,26 @@
+# ------------------------------------------------------
+# This module formats Server-Sent Events (SSE) for the
+# streaming endpoints. Each event has a name ("token",
+# "scores", "result", "error") and a JSON data payload.
+# ------------------------------------------------------
+
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data) -> str:
+    """Format one SSE message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+def sse_response(events) -> StreamingResponse:
+    """
+    Stream an async generator of formatted events. Proxy buffering is
+    disabled so each event reaches the browser as soon as it is sent.
+    """
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,169 @@
+# ------------------------------------------------------
+# This module defines and checks the JSON the models return.
+# Output schemas are derived from the API schemas (RFPCreate,
+# ProposalBase, ComparisonResult) and sent with the prompt;
+# replies are requested in JSON mode and validated field by
+# field, so a bad field can be re-requested on its own instead
+# of repeating the whole call.
+# ------------------------------------------------------
+
+import os
+import json
+from typing import List, Optional, Annotated
+from dotenv import load_dotenv
+from pydantic import Field, TypeAdapter, ValidationError, create_model
+from schemas import RFPCreate, ProposalBase, ComparisonResult, VendorComparison, Recommendation
+from prompt_builder import compact_json
+
+load_dotenv()
+
+# Ask for JSON mode (response_format=json_object) where the model supports it
+AI_JSON_MODE = os.getenv("AI_JSON_MODE", "true").lower() in ("1", "true", "yes")
+
+# Repair requests for invalid fields before giving up on them
+AI_JSON_REPAIR_ATTEMPTS = int(os.getenv("AI_JSON_REPAIR_ATTEMPTS", "1"))
+
+# Older chat models that reject response_format
+JSON_MODE_UNSUPPORTED_MODELS = {
+    "gpt-4", "gpt-4-0314", "gpt-4-0613", "gpt-4-32k", "gpt-4-32k-0314", "gpt-4-32k-0613",
+    "gpt-3.5-turbo-0301", "gpt-3.5-turbo-0613", "gpt-3.5-turbo-16k", "gpt-3.5-turbo-16k-0613"
+}
+
+
+def supports_json_mode(model: str) -> bool:
+    """Whether JSON mode should be requested for `model`."""
+    return AI_JSON_MODE and model not in JSON_MODE_UNSUPPORTED_MODELS
+
+
+def derive_model(name: str, base, include: tuple = None, exclude: tuple = (), **fields):
+    """
+    Pydantic model with `base`'s fields (optionally only `include`,
+    minus `exclude`), plus or overriding the given (type, default) fields.
+    """
+    derived = {
+        field_name: (info.annotation, info)
+        for field_name, info in base.model_fields.items()
+        if (include is None or field_name in include) and field_name not in exclude
+    }
+    derived.update(fields)
+    return create_model(name, **derived)
+
+
+# ======================================================
+# Output schemas of each AI operation
+# ======================================================
+
+# parse_rfp: the fields of a manually created RFP
+RFPParseOutput = derive_model("RFPParseOutput", RFPCreate)
+
+# extract_proposal: proposal fields (ids are known already) plus completeness
+ProposalExtractionOutput = derive_model(
+    "ProposalExtractionOutput", ProposalBase,
+    exclude=("rfp_id", "vendor_id"),
+    completeness_score=(Optional[float], Field(None, ge=0, le=1))
+)
+
+# comparison_narrative: wording only; scores and ranks are computed locally
+NarrativeEntryOutput = derive_model(
+    "NarrativeEntryOutput", VendorComparison, include=("vendor_name", "strengths", "weaknesses")
+)
+NarrativeRecommendationOutput = derive_model(
+    "NarrativeRecommendationOutput", Recommendation, include=("reason", "summary")
+)
+ComparisonNarrativeOutput = derive_model(
+    "ComparisonNarrativeOutput", ComparisonResult,
+    comparison=(List[NarrativeEntryOutput], ...),
+    recommendation=(NarrativeRecommendationOutput, ...)
+)
+
+
+def _strip_titles(schema):
+    """Drop the auto-generated "title" keys; they only cost prompt tokens."""
+    if isinstance(schema, dict):
+        return {
+            key: _strip_titles(value) for key, value in schema.items()
+            if not (key == "title" and isinstance(value, str))
+        }
+    if isinstance(schema, list):
+        return [_strip_titles(value) for value in schema]
+    return schema
+
+
+def schema_json(output_model, fields=None) -> str:
+    """Compact JSON schema of `output_model` (only `fields`, if given) for prompts."""
+    schema = _strip_titles(output_model.model_json_schema())
+    if fields is not None:
+        schema["properties"] = {name: schema["properties"][name] for name in fields}
+        schema["required"] = [name for name in schema.get("required", []) if name in fields]
+    return compact_json(schema)
+
+
+# ======================================================
+# Parsing and field-level validation
+# ======================================================
+
+def parse_json_object(content: str) -> dict:
+    """
+    Parse the JSON object in a model reply. Code fences and text around
+    the object are ignored. Raises ValueError if there is no object.
+    """
+    content = (content or "").strip()
+    try:
+        value = json.loads(content)
+    except ValueError:
+        start = content.find("{")
+        if start < 0:
+            raise ValueError("Reply contains no JSON object")
+        value, _ = json.JSONDecoder().raw_decode(content[start:])
+    if not isinstance(value, dict):
+        raise ValueError("Reply is not a JSON object")
+    return value
+
+
+# Validators are built once per (model, field)
+_adapters = {}
+
+
+def _adapter(output_model, field_name: str) -> TypeAdapter:
+    key = (output_model, field_name)
+    if key not in _adapters:
+        info = output_model.model_fields[field_name]
+        # Keep constraints such as ge/le that live in the field metadata
+        annotation = Annotated[(info.annotation, *info.metadata)] if info.metadata else info.annotation
+        _adapters[key] = TypeAdapter(annotation)
+    return _adapters[key]
+
+
+def validate_fields(data: dict, output_model, fields=None):
+    """
+    Validate each field of `data` on its own. Returns (valid, errors):
+    the valid fields as JSON-ready values and a message per invalid or
+    missing required field. Only `fields` are checked when given.
+    """
+    valid, errors = {}, {}
+    for name, info in output_model.model_fields.items():
+        if fields is not None and name not in fields:
+            continue
+        if name not in data:
+            if info.is_required() or fields is not None:
+                errors[name] = "missing"
+            continue
+        adapter = _adapter(output_model, name)
+        try:
+            valid[name] = adapter.dump_python(adapter.validate_python(data[name]), mode="json")
+        except ValidationError as e:
+            errors[name] = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+                for error in e.errors()
+            )
+    return valid, errors
+
+
+def repair_prompt(errors: dict, output_model) -> str:
+    """Follow-up message asking the model to resend only the invalid fields."""
+    problems = "\n".join(f"- {name}: {message}" for name, message in errors.items())
+    return f"""Some fields in your JSON were missing or invalid:
+{problems}
+
+Return a JSON object containing ONLY these fields, corrected, matching this schema:
+{schema_json(output_model, list(errors))}"""
@@ -0,0 +1,84 @@
+# ------------------------------------------------------
+# Shared test setup. The app reads its configuration from the
+# environment at import time, so the test database (a temp
+# SQLite file), the offline AI backend and generous API limits
+# are set here before any backend module is imported.
+# ------------------------------------------------------
+
+import os
+import sys
+import asyncio
+import tempfile
+
+import httpx
+import pytest
+
+_tmp_dir = tempfile.mkdtemp(prefix="rfp-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ["AI_BACKEND"] = "local"
+os.environ["AI_CACHE_PATH"] = ""
+os.environ["AI_LOCAL_LATENCY_MS"] = "10"
+os.environ["AI_LOCAL_LATENCY_JITTER_MS"] = "0"
+os.environ["AI_LOCAL_TOKENS_PER_SECOND"] = "0"
+os.environ["AI_LOCAL_RETRY_AFTER_SECONDS"] = "0.05"
+os.environ["OPENAI_API_KEY"] = "test"
+os.environ["OPENAI_RPM_LIMIT"] = "100000"
+os.environ["OPENAI_TPM_LIMIT"] = "100000000"
+os.environ["INBOX_SOURCE"] = ""
+
+# Backend modules are imported as top-level modules (as uvicorn does)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from ai_backends import ai_backend  # noqa: E402
+from ai_cache import ai_result_cache  # noqa: E402
+from database import engine, read_engine, Base  # noqa: E402
+
+
+async def _run_with_app(scenario):
+    """Start the app on an empty database, run `scenario(client)`, then shut down."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    ai_result_cache.clear()
+
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            # Open the first read connection on its own: SQLAlchemy's first-connect
+            # lock stays bound to the event loop of an earlier test if it was contended
+            async with read_engine.connect():
+                pass
+            # Server errors come back as 500 responses, as they would over HTTP
+            transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+    finally:
+        # A failed scenario skips the lifespan shutdown; idle pooled
+        # connections would otherwise keep the test process alive
+        await engine.dispose()
+        await read_engine.dispose()
+
+
+@pytest.fixture
+def run_app():
+    """Run an async scenario against a fresh app: run_app(async def scenario(client): ...)."""
+    return lambda scenario: asyncio.run(_run_with_app(scenario))
+
+
+@pytest.fixture
+def local_backend(monkeypatch):
+    """The offline model backend; attribute changes are undone after the test."""
+    for name in ("latency_ms", "jitter_ms", "tokens_per_second", "failure_rate", "rate_limit_rate", "_random"):
+        monkeypatch.setattr(ai_backend, name, getattr(ai_backend, name))
+    return ai_backend
+
+
+async def create_rfp(client, **fields) -> dict:
+    response = await client.post("/api/rfps/", json={"title": "Laptops", **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def create_vendor(client, index: int) -> dict:
+    response = await client.post("/api/vendors/", json={"name": f"Vendor {index}", "email": f"vendor{index}@example.com"})
+    assert response.status_code == 200, response.text
+    return response.json()
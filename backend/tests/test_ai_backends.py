@@ -0,0 +1,43 @@
+# ------------------------------------------------------
+# Model backend tests: the backend interface is enforced when
+# a backend is created, and the local backend answers every
+# operation with schema-valid JSON.
+# ------------------------------------------------------
+
+import json
+import asyncio
+
+import pytest
+
+from ai_backends import ModelBackend, LocalBackend, create_backend
+from structured_output import RFPParseOutput, validate_fields
+
+
+def test_incomplete_backend_cannot_be_created():
+    class CompleteOnly(ModelBackend):
+        async def complete(self, operation, model, messages, json_mode=False):
+            return None
+
+    with pytest.raises(TypeError):
+        CompleteOnly()
+
+
+def test_unknown_backend_name_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend("nonexistent")
+
+
+def test_local_backend_replies_with_valid_rfp():
+    backend = LocalBackend(latency_ms=0, jitter_ms=0, tokens_per_second=0)
+    messages = [{"role": "user", "content": "User request: Need 20 laptops with 16GB RAM, budget $50,000 within 30 days"}]
+
+    async def scenario():
+        completion = await backend.complete("parse_rfp", "gpt-4o", messages, json_mode=True)
+        streamed = "".join([delta async for delta in await backend.stream("parse_rfp", "gpt-4o", messages)])
+        return completion, streamed
+
+    completion, streamed = asyncio.run(scenario())
+    assert streamed == completion.text
+    _, errors = validate_fields(json.loads(completion.text), RFPParseOutput)
+    assert errors == {}
+    assert completion.usage.total_tokens > 0
@@ -0,0 +1,59 @@
+# ------------------------------------------------------
+# Stored comparison tests: results are reused only while the
+# proposals and the RFP are unchanged, and streaming holds no
+# database connection while the narrative is written.
+# ------------------------------------------------------
+
+import asyncio
+
+from conftest import create_rfp, create_vendor
+from database import engine, read_engine
+
+
+async def _create_proposal(client, rfp: dict, vendor: dict, **fields) -> dict:
+    response = await client.post("/api/proposals/", json={"rfp_id": rfp["id"], "vendor_id": vendor["id"], **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_rfp_update_invalidates_stored_comparison(run_app):
+    async def scenario(client):
+        rfp = await create_rfp(client, budget=1000)
+        vendor = await create_vendor(client, 1)
+        await _create_proposal(client, rfp, vendor, total_price=900, delivery_days=10)
+
+        comparison = (await client.get(f"/api/proposals/rfp/{rfp['id']}/compare")).json()
+        assert "Within budget" in comparison["comparison"][0]["strengths"]
+
+        response = await client.put(f"/api/rfps/{rfp['id']}", json={"budget": 500})
+        assert response.status_code == 200, response.text
+
+        comparison = (await client.get(f"/api/proposals/rfp/{rfp['id']}/compare")).json()
+        assert "Within budget" not in comparison["comparison"][0]["strengths"]
+        assert "Over budget by $400.00" in comparison["comparison"][0]["weaknesses"]
+
+    run_app(scenario)
+
+
+def test_stream_holds_no_connection_during_narrative(run_app, local_backend):
+    latency = 0.3
+    local_backend.latency_ms = latency * 1000
+
+    async def scenario(client):
+        rfp = await create_rfp(client, budget=1000)
+        for index in range(3):
+            vendor = await create_vendor(client, index)
+            await _create_proposal(client, rfp, vendor, total_price=900 + index, delivery_days=10)
+
+        async def checked_out_mid_narrative():
+            await asyncio.sleep(latency / 2)
+            return engine.pool.checkedout() + read_engine.pool.checkedout()
+
+        responses, checked_out = await asyncio.gather(
+            asyncio.gather(*[client.get(f"/api/proposals/rfp/{rfp['id']}/compare/stream") for _ in range(5)]),
+            checked_out_mid_narrative()
+        )
+        assert all("event: result" in response.text for response in responses)
+        assert checked_out == 0
+
+    run_app(scenario)
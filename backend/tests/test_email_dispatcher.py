@@ -0,0 +1,47 @@
+# ------------------------------------------------------
+# Outbox dispatcher tests: a failing send must never leave
+# claimed emails stuck in "sending".
+# ------------------------------------------------------
+
+import asyncio
+
+import email_dispatcher as dispatcher_module
+from conftest import create_rfp, create_vendor
+from email_templates import RFPEmailTemplate
+
+
+def test_template_accepts_text_specifications():
+    template = RFPEmailTemplate({"title": "Laptops", "items": [{"name": "Laptop", "specifications": "16GB RAM"}]})
+    assert "- Laptop - 16GB RAM" in template.render_text("Vendor 1")
+    assert "<strong>Laptop</strong> - 16GB RAM" in template.render_html("Vendor 1")
+
+
+async def _wait_for_job(client, job_id: str) -> dict:
+    for _ in range(100):
+        job = (await client.get(f"/api/email/jobs/{job_id}")).json()
+        if not {"queued", "sending"} & set(job["counts"]):
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"Send job still pending: {job}")
+
+
+def test_failed_batch_is_rescheduled_not_left_sending(run_app, monkeypatch):
+    async def broken_send(vendors, rfp_data):
+        raise RuntimeError("template exploded")
+
+    monkeypatch.setattr(dispatcher_module, "send_rfp_to_vendors", broken_send)
+
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendors = [await create_vendor(client, index) for index in range(2)]
+        response = await client.post("/api/email/send-rfp", json={
+            "rfp_id": rfp["id"], "vendor_ids": [vendor["id"] for vendor in vendors]
+        })
+        assert response.status_code == 200, response.text
+
+        job = await _wait_for_job(client, response.json()["job_id"])
+        assert job["counts"] == {"retrying": 2}
+        assert all(result["attempts"] == 1 for result in job["results"])
+        assert all("template exploded" in result["error"] for result in job["results"])
+
+    run_app(scenario)
@@ -0,0 +1,112 @@
+# ------------------------------------------------------
+# Concurrency tests for /api/email/receive: parallel replies
+# from one vendor must upsert a single proposal, and replies
+# from many vendors must wait for the model side by side.
+# ------------------------------------------------------
+
+import time
+import asyncio
+
+from sqlalchemy import select, func
+
+import ai_service
+from conftest import create_rfp, create_vendor
+from database import ReadSessionLocal, Proposal, engine, read_engine
+from routers import email as email_router
+
+
+def test_parallel_receives_from_one_vendor_create_one_proposal(run_app):
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendor = await create_vendor(client, 1)
+
+        responses = await asyncio.gather(*[
+            client.post("/api/email/receive", json={
+                "from_email": vendor["email"],
+                "subject": f"Re: RFP #{rfp['id']}",
+                "body": f"Our quote, revision {attempt}",
+                "rfp_id": rfp["id"]
+            })
+            for attempt in range(10)
+        ])
+        assert [response.status_code for response in responses] == [200] * 10
+
+        async with ReadSessionLocal() as db:
+            count = (await db.execute(
+                select(func.count()).select_from(Proposal).where(
+                    Proposal.rfp_id == rfp["id"], Proposal.vendor_id == vendor["id"]
+                )
+            )).scalar_one()
+        assert count == 1
+
+    run_app(scenario)
+
+
+def test_concurrent_receives_overlap_model_calls(run_app, local_backend, monkeypatch):
+    latency = 0.3
+    local_backend.latency_ms = latency * 1000
+    local_backend.jitter_ms = 0
+    # Every email goes to the model, so each request waits one model latency
+    monkeypatch.setattr(ai_service, "EXTRACTION_TIERS", ["large"])
+
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendors = [await create_vendor(client, index) for index in range(10)]
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/email/receive", json={
+                "from_email": vendor["email"],
+                "subject": f"Re: RFP #{rfp['id']}",
+                "body": f"Quote from {vendor['name']}",
+                "rfp_id": rfp["id"]
+            })
+            for vendor in vendors
+        ])
+        elapsed = time.perf_counter() - started
+
+        assert [response.status_code for response in responses] == [200] * 10
+        # Awaited calls overlap: about one latency in total, not ten
+        assert elapsed < 3 * latency, f"10 receives took {elapsed:.2f}s"
+
+    run_app(scenario)
+
+
+def test_receives_hold_no_connection_during_extraction(run_app, local_backend, monkeypatch):
+    latency = 0.3
+    local_backend.latency_ms = latency * 1000
+    monkeypatch.setattr(ai_service, "EXTRACTION_TIERS", ["large"])
+
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendors = [await create_vendor(client, index) for index in range(10)]
+
+        async def checked_out_mid_extraction():
+            await asyncio.sleep(latency / 2)
+            return engine.pool.checkedout() + read_engine.pool.checkedout()
+
+        *responses, checked_out = await asyncio.gather(*[
+            client.post("/api/email/receive", json={
+                "from_email": vendor["email"],
+                "subject": f"Re: RFP #{rfp['id']}",
+                "body": f"Quote from {vendor['name']}",
+                "rfp_id": rfp["id"]
+            })
+            for vendor in vendors
+        ], checked_out_mid_extraction())
+
+        assert [response.status_code for response in responses] == [200] * 10
+        assert checked_out == 0
+
+    run_app(scenario)
+
+
+def test_batch_size_is_limited(run_app, monkeypatch):
+    monkeypatch.setattr(email_router, "EMAIL_RECEIVE_MAX_BATCH", 2)
+
+    async def scenario(client):
+        emails = [{"from_email": f"vendor{index}@example.com", "subject": "Re: RFP #1", "body": "Quote"} for index in range(3)]
+        response = await client.post("/api/email/receive-batch", json={"emails": emails})
+        assert response.status_code == 400
+
+    run_app(scenario)
@@ -0,0 +1,82 @@
+# ------------------------------------------------------
+# SMTP pool test against a local aiosmtpd server: sending
+# many RFP emails reuses a few logged-in connections instead
+# of opening one per vendor.
+# ------------------------------------------------------
+
+import socket
+import asyncio
+
+import pytest
+
+import email_service
+from email_service import SMTPConnectionPool, send_rfp_to_vendors
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+
+
+class _RecordingHandler:
+    """Counts SMTP sessions (one EHLO each) and delivered messages."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = _RecordingHandler()
+    controller = aiosmtpd_controller.Controller(
+        handler, hostname="127.0.0.1", port=_free_port(),
+        authenticator=lambda server, session, envelope, mechanism, auth_data: AuthResult(success=True),
+        auth_require_tls=False
+    )
+    controller.start()
+    monkeypatch.setattr(email_service, "SMTP_HOST", controller.hostname)
+    monkeypatch.setattr(email_service, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(email_service, "SMTP_USER", "procurement@example.com")
+    monkeypatch.setattr(email_service, "SMTP_PASSWORD", "secret")
+    monkeypatch.setattr(email_service, "SMTP_USE_TLS", False)
+    try:
+        yield handler
+    finally:
+        controller.stop()
+
+
+def test_pool_reuses_connections_across_sends(smtp_server, monkeypatch):
+    pool = SMTPConnectionPool(max_size=3, max_messages_per_connection=100, healthcheck_idle_seconds=30)
+    monkeypatch.setattr(email_service, "smtp_pool", pool)
+    vendors = [{"id": index, "name": f"Vendor {index}", "email": f"vendor{index}@example.com"} for index in range(20)]
+    rfp_data = {"title": "Laptops", "items": [{"name": "Laptop", "quantity": 10}]}
+
+    async def scenario():
+        try:
+            for _ in range(2):
+                results = await send_rfp_to_vendors(vendors, rfp_data)
+                assert [result["status"] for result in results] == ["sent"] * 20
+            return pool.stats()
+        finally:
+            await pool.close()
+
+    stats = asyncio.run(scenario())
+    assert stats["messages_sent"] == 40
+    assert len(smtp_server.messages) == 40
+    # 40 messages over at most max_size logged-in sessions
+    assert 1 <= stats["connections_opened"] <= 3
+    assert smtp_server.sessions == stats["connections_opened"]
@@ -0,0 +1,75 @@
+# ------------------------------------------------------
+# Extraction routing tests: the regex tier must not be
+# confidently wrong, and a model outage must not replace a
+# proposal with a guess.
+# ------------------------------------------------------
+
+import pytest
+
+import ai_service
+from ai_cache import ai_result_cache
+from conftest import create_rfp, create_vendor
+from extraction_router import heuristic_extract, is_confident
+
+
+@pytest.mark.parametrize("email, field", [
+    # A unit price is not the total
+    ("Total for 10 units at $500 each. Delivery in 14 days. Net 30. 1 year warranty.", "total_price"),
+    # Negated delivery promises are ignored, so the real lead time is unknown
+    ("Total: $5,000. We cannot deliver in 30 days; we need 60 days. Net 30, 1 year warranty.", "delivery_days"),
+    # Conflicting values are left to a model
+    ("Total: $5,000. Revised total: $5,400. Delivery in 14 days. Net 30, 1 year warranty.", "total_price"),
+    ("Total: $5,000. Delivery in 14 days, or shipping in 21 days for the rest. Net 30, 1 year warranty.",
+     "delivery_days"),
+])
+def test_heuristics_escalate_ambiguous_emails(email, field):
+    result = heuristic_extract(email, {})
+    assert result[field] is None
+    assert not is_confident(result, {})
+
+
+def test_heuristics_accept_clear_emails():
+    result = heuristic_extract(
+        "Our total price is $4,800. We can deliver no later than 21 days. 1 year warranty, Net 45.", {}
+    )
+    assert (result["total_price"], result["delivery_days"]) == (4800.0, 21)
+    assert is_confident(result, {})
+
+
+def _receive(client, rfp, vendor, body):
+    return client.post("/api/email/receive", json={
+        "from_email": vendor["email"], "subject": f"Re: RFP #{rfp['id']}", "body": body, "rfp_id": rfp["id"]
+    })
+
+
+def test_model_outage_does_not_overwrite_proposal(run_app, local_backend):
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendor = await create_vendor(client, 1)
+        response = await _receive(client, rfp, vendor, "Total: $12,400. Delivery in 20 days. Net 30. 1 year warranty.")
+        assert response.status_code == 200, response.text
+        cached = ai_result_cache.stats()["memory_entries"]
+
+        # Every model call fails; the vague reply must not fall back to the regex guess
+        local_backend.failure_rate = 1.0
+        response = await _receive(client, rfp, vendor, "Thanks, we will follow up with a revised quote.")
+        assert response.status_code == 500
+
+        proposals = (await client.get("/api/proposals/", params={"rfp_id": rfp["id"]})).json()
+        assert [proposal["total_price"] for proposal in proposals] == [12400.0]
+        assert ai_result_cache.stats()["memory_entries"] == cached
+
+    run_app(scenario)
+
+
+def test_unconfident_result_is_not_cached(run_app, monkeypatch):
+    monkeypatch.setattr(ai_service, "EXTRACTION_TIERS", ["heuristic"])
+
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendor = await create_vendor(client, 1)
+        response = await _receive(client, rfp, vendor, "Thanks, we will follow up with a revised quote.")
+        assert response.status_code == 200, response.text
+        assert ai_result_cache.stats()["memory_entries"] == 0
+
+    run_app(scenario)
@@ -0,0 +1,70 @@
+# ------------------------------------------------------
+# Inbox poller tests against a temporary Maildir: every
+# delivered reply is processed once, and transient failures
+# are retried on the next poll instead of being skipped.
+# ------------------------------------------------------
+
+import mailbox
+from email.message import EmailMessage
+
+import ai_service
+from conftest import create_rfp, create_vendor
+from inbox_service import MaildirSource, inbox_poller
+
+
+def _deliver(path, from_email: str, rfp_id: int, body: str) -> None:
+    message = EmailMessage()
+    message["From"] = from_email
+    message["Subject"] = f"Re: RFP #{rfp_id}"
+    message.set_content(body)
+    mailbox.Maildir(path, create=True).add(message)
+
+
+async def _proposal_count(client, rfp_id: int) -> int:
+    return len((await client.get("/api/proposals/", params={"rfp_id": rfp_id})).json())
+
+
+def test_messages_delivered_between_polls_are_processed(run_app, tmp_path):
+    path = str(tmp_path / "inbox")
+
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendors = [await create_vendor(client, index) for index in range(3)]
+
+        _deliver(path, vendors[0]["email"], rfp["id"], "Total: $1,000. Delivery in 10 days.")
+        assert (await inbox_poller.poll(MaildirSource(path)))["processed"] == 1
+
+        for vendor in vendors[1:]:
+            _deliver(path, vendor["email"], rfp["id"], f"Total: $2,000. Delivery in 12 days. {vendor['name']}")
+        assert (await inbox_poller.poll(MaildirSource(path)))["processed"] == 2
+        assert (await inbox_poller.poll(MaildirSource(path)))["processed"] == 0
+        assert await _proposal_count(client, rfp["id"]) == 3
+
+    run_app(scenario)
+
+
+def test_transient_failures_are_retried_and_unmatched_replies_skipped(run_app, tmp_path, local_backend, monkeypatch):
+    path = str(tmp_path / "inbox")
+    monkeypatch.setattr(ai_service, "EXTRACTION_TIERS", ["large"])
+
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendor = await create_vendor(client, 1)
+        _deliver(path, "stranger@example.com", rfp["id"], "Total: $500.")
+        result = await inbox_poller.poll(MaildirSource(path))
+        assert (result["processed"], result["failed"], result["deferred"]) == (0, 1, 0)
+
+        # Model outage: the vendor reply stays in the inbox
+        _deliver(path, vendor["email"], rfp["id"], "Please see our quote.")
+        local_backend.failure_rate = 1.0
+        for _ in range(2):
+            result = await inbox_poller.poll(MaildirSource(path))
+            assert (result["processed"], result["failed"], result["deferred"]) == (0, 0, 1)
+        assert await _proposal_count(client, rfp["id"]) == 0
+
+        local_backend.failure_rate = 0
+        result = await inbox_poller.poll(MaildirSource(path))
+        assert (result["processed"], result["failed"], result["deferred"]) == (1, 0, 0)
+        assert await _proposal_count(client, rfp["id"]) == 1
+
+    run_app(scenario)
@@ -0,0 +1,23 @@
+# ------------------------------------------------------
+# Proposal upsert tests: posting a proposal again for the same
+# vendor only overwrites the fields that were sent.
+# ------------------------------------------------------
+
+from conftest import create_rfp, create_vendor
+
+
+def test_repost_keeps_fields_that_were_not_sent(run_app):
+    async def scenario(client):
+        rfp = await create_rfp(client)
+        vendor = await create_vendor(client, 1)
+        ids = {"rfp_id": rfp["id"], "vendor_id": vendor["id"]}
+
+        first = await client.post("/api/proposals/", json={**ids, "total_price": 900, "delivery_days": 10, "warranty": "1 year"})
+        second = await client.post("/api/proposals/", json={**ids, "total_price": 850})
+        assert first.status_code == second.status_code == 200, second.text
+
+        proposal = second.json()
+        assert proposal["id"] == first.json()["id"]
+        assert (proposal["total_price"], proposal["delivery_days"], proposal["warranty"]) == (850, 10, "1 year")
+
+    run_app(scenario)
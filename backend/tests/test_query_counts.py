@@ -0,0 +1,62 @@
+# ------------------------------------------------------
+# N+1 checks: listing and comparing proposals must run the
+# same number of SQL statements for 2 proposals as for 20.
+# ------------------------------------------------------
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from conftest import create_rfp, create_vendor
+from database import engine, read_engine
+
+
+@contextmanager
+def count_statements():
+    """Count SQL statements run on either engine inside the block."""
+    counter = {"statements": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    engines = {engine.sync_engine, read_engine.sync_engine}
+    for sync_engine in engines:
+        event.listen(sync_engine, "before_cursor_execute", on_execute)
+    try:
+        yield counter
+    finally:
+        for sync_engine in engines:
+            event.remove(sync_engine, "before_cursor_execute", on_execute)
+
+
+async def _rfp_with_proposals(client, vendors: list) -> dict:
+    rfp = await create_rfp(client, budget=100000)
+    for index, vendor in enumerate(vendors):
+        response = await client.post("/api/proposals/", json={
+            "rfp_id": rfp["id"], "vendor_id": vendor["id"], "total_price": 1000 + index, "delivery_days": 10 + index,
+            "items": [{"name": "Laptop", "quantity": 10, "unit_price": 100 + index, "total_price": 1000 + index}]
+        })
+        assert response.status_code == 200, response.text
+    return rfp
+
+
+def test_proposal_queries_do_not_grow_with_proposal_count(run_app):
+    async def scenario(client):
+        vendors = [await create_vendor(client, index) for index in range(20)]
+        small = await _rfp_with_proposals(client, vendors[:2])
+        large = await _rfp_with_proposals(client, vendors)
+
+        async def statements(path: str, **params) -> int:
+            with count_statements() as counter:
+                response = await client.get(path, params=params)
+            assert response.status_code == 200, response.text
+            return counter["statements"]
+
+        for rfp in (small, large):
+            listed = await statements("/api/proposals/", rfp_id=rfp["id"], limit=50)
+            compared = await statements(f"/api/proposals/rfp/{rfp['id']}/compare")
+            rfp["counts"] = (listed, compared)
+
+        assert small["counts"] == large["counts"]
+
+    run_app(scenario)
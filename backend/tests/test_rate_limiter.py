@@ -0,0 +1,148 @@
+# ------------------------------------------------------
+# AIRateLimiter tests: 429 responses are retried after the
+# server's Retry-After (or with exponential backoff), the
+# pause applies to every caller, and queued calls are granted
+# by priority, FIFO within a priority.
+# ------------------------------------------------------
+
+import time
+import random
+import asyncio
+
+import httpx
+from openai import RateLimitError
+
+import ai_rate_limiter as limiter_module
+from ai_rate_limiter import AIRateLimiter, ai_rate_limiter, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from ai_service import parse_natural_language_to_rfp
+
+
+def _rate_limit_error(headers: dict = None) -> RateLimitError:
+    return RateLimitError(
+        "Rate limit reached",
+        response=httpx.Response(429, headers=headers or {}, request=httpx.Request("POST", "http://test/")),
+        body=None
+    )
+
+
+def _failing(times: int, headers: dict = None):
+    """Request that answers 429 `times` times, then succeeds."""
+    calls = []
+
+    async def make_request():
+        calls.append(time.monotonic())
+        if len(calls) <= times:
+            raise _rate_limit_error(headers)
+        return "ok"
+
+    return make_request, calls
+
+
+def test_retry_after_header_is_honored():
+    async def scenario():
+        limiter = AIRateLimiter(rpm=1000, tpm=100000, max_concurrency=4)
+        make_request, calls = _failing(1, {"retry-after": "0.2"})
+        assert await limiter.call(make_request, 10) == "ok"
+        assert calls[1] - calls[0] >= 0.2
+        assert (limiter.rate_limited, limiter.retries) == (1, 1)
+
+        make_request, calls = _failing(1, {"retry-after-ms": "150"})
+        assert await limiter.call(make_request, 10) == "ok"
+        assert 0.15 <= calls[1] - calls[0] < 1
+
+    asyncio.run(scenario())
+
+
+def test_backoff_without_retry_after_grows_exponentially(monkeypatch):
+    monkeypatch.setattr(limiter_module, "OPENAI_RETRY_BASE_SECONDS", 0.1)
+
+    async def scenario():
+        limiter = AIRateLimiter(rpm=1000, tpm=100000, max_concurrency=4)
+        make_request, calls = _failing(2)
+        assert await limiter.call(make_request, 10) == "ok"
+        # Jittered delays: 0.05-0.1 s, then 0.1-0.2 s
+        assert 0.05 <= calls[1] - calls[0] < 0.5
+        assert 0.1 <= calls[2] - calls[1] < 0.5
+        assert limiter.retries == 2
+
+    asyncio.run(scenario())
+
+
+def test_retries_give_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(limiter_module, "OPENAI_MAX_RETRIES", 2)
+
+    async def scenario():
+        limiter = AIRateLimiter(rpm=1000, tpm=100000, max_concurrency=4)
+        make_request, calls = _failing(10, {"retry-after": "0"})
+        try:
+            await limiter.call(make_request, 10)
+        except RateLimitError:
+            pass
+        else:
+            raise AssertionError("RateLimitError was not raised")
+        assert len(calls) == 3
+        assert limiter.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_pauses_every_caller():
+    async def scenario():
+        limiter = AIRateLimiter(rpm=1000, tpm=100000, max_concurrency=4)
+        make_request, _ = _failing(1, {"retry-after": "0.3"})
+        limited = asyncio.create_task(limiter.call(make_request, 10))
+        await asyncio.sleep(0.05)
+
+        # A call made during the pause waits for it too
+        started = time.monotonic()
+        other, _ = _failing(0)
+        assert await limiter.call(other, 10) == "ok"
+        assert time.monotonic() - started >= 0.2
+        assert await limited == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_queued_calls_are_granted_by_priority():
+    async def scenario():
+        limiter = AIRateLimiter(rpm=1000, tpm=100000, max_concurrency=1)
+        await limiter.acquire(10, PRIORITY_INTERACTIVE)
+
+        granted = []
+
+        async def wait_for_slot(name: str, priority: int):
+            await limiter.acquire(10, priority)
+            granted.append(name)
+            limiter.release()
+
+        waiters = []
+        for name, priority in (("batch-1", PRIORITY_BATCH), ("batch-2", PRIORITY_BATCH),
+                               ("interactive-1", PRIORITY_INTERACTIVE), ("interactive-2", PRIORITY_INTERACTIVE)):
+            waiters.append(asyncio.create_task(wait_for_slot(name, priority)))
+            await asyncio.sleep(0)
+
+        limiter.release()
+        await asyncio.gather(*waiters)
+        assert granted == ["interactive-1", "interactive-2", "batch-1", "batch-2"]
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_calls_complete_despite_429s(run_app, local_backend):
+    # Injected 429s carry AI_LOCAL_RETRY_AFTER_SECONDS (set low in conftest)
+    local_backend.rate_limit_rate = 0.3
+    local_backend._random = random.Random(7)
+    before = ai_rate_limiter.stats()
+
+    async def scenario(client):
+        return await asyncio.gather(*[
+            parse_natural_language_to_rfp(f"Need {index + 1} laptops with 16GB RAM, budget ${1000 * (index + 1)}")
+            for index in range(20)
+        ])
+
+    results = run_app(scenario)
+    after = ai_rate_limiter.stats()
+    assert all(isinstance(result, dict) and result.get("title") for result in results)
+    assert after["rate_limited"] > before["rate_limited"]
+    assert after["retries"] > before["retries"]
+    assert after["in_flight"] == 0
@@ -9,4 +9,74 @@ const client = axios.create({
   },
 });
 
+// Fetch one page from a paginated list endpoint.
+// Returns the rows plus the total count and the cursor for the next page.
+export const fetchPage = async (path, params = {}) => {
+  const response = await client.get(path, { params });
+  return {
+    items: response.data,
+    total: Number(response.headers['x-total-count'] ?? response.data.length),
+    nextCursor: response.headers['x-next-cursor'] || null,
+  };
+};
+
+// Follow cursors until every page of a list endpoint has been loaded
+export const fetchAllPages = async (path, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const page = await fetchPage(path, cursor ? { ...params, cursor } : params);
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return items;
+};
+
+// Read a Server-Sent Events stream from the API (fetch is used because
+// EventSource cannot POST). Calls onEvent(name, data) for every event and
+// resolves with the data of the final "result" event.
+export const streamEvents = async (path, { method = 'GET', params, body } = {}, onEvent = () => {}) => {
+  const query = params ? `?${new URLSearchParams(params)}` : '';
+  const response = await fetch(`${API_BASE_URL}${path}${query}`, {
+    method,
+    headers: body ? { 'Content-Type': 'application/json' } : {},
+    body: body ? JSON.stringify(body) : undefined,
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.detail || `Request failed (${response.status})`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      raw.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      const parsed = data ? JSON.parse(data) : null;
+
+      if (event === 'error') throw new Error(parsed?.detail || 'Stream failed');
+      if (event === 'result') result = parsed;
+      onEvent(event, parsed);
+    }
+  }
+  return result;
+};
+
 export default client;
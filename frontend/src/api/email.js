@@ -6,6 +6,11 @@ export const emailApi = {
     return response.data;
   },
 
+  getSendJob: async (jobId) => {
+    const response = await client.get(`/email/jobs/${jobId}`);
+    return response.data;
+  },
+
   receiveEmail: async (request) => {
     const response = await client.post('/email/receive', request);
     return response.data;
@@ -1,19 +1,26 @@
-import client from './client';
+import client, { fetchPage, fetchAllPages, streamEvents } from './client';
 
 export const proposalsApi = {
   getAll: async (rfpId) => {
     const params = rfpId ? { rfp_id: rfpId } : {};
-    const response = await client.get('/proposals', { params });
-    return response.data;
+    return fetchAllPages('/proposals', params);
   },
 
+  getPage: async (params = {}) => fetchPage('/proposals', params),
+
   getById: async (id) => {
     const response = await client.get(`/proposals/${id}`);
     return response.data;
   },
 
-  compare: async (rfpId) => {
-    const response = await client.get(`/proposals/rfp/${rfpId}/compare`);
+  // Scores are computed locally; { narrative: true } adds AI-written text
+  compare: async (rfpId, params = {}) => {
+    const response = await client.get(`/proposals/rfp/${rfpId}/compare`, { params });
     return response.data;
   },
+
+  // Streams the comparison with AI narrative: onEvent receives "scores"
+  // (instant local result) and "token" events; resolves with the final result
+  compareStream: async (rfpId, params = {}, onEvent) =>
+    streamEvents(`/proposals/rfp/${rfpId}/compare/stream`, { params }, onEvent),
 };
@@ -1,10 +1,9 @@
-import client from './client';
+import client, { fetchPage, fetchAllPages, streamEvents } from './client';
 
 export const rfpsApi = {
-  getAll: async () => {
-    const response = await client.get('/rfps');
-    return response.data;
-  },
+  getAll: async (params = {}) => fetchAllPages('/rfps', params),
+
+  getPage: async (params = {}) => fetchPage('/rfps', params),
 
   getById: async (id) => {
     const response = await client.get(`/rfps/${id}`);
@@ -16,6 +15,12 @@ export const rfpsApi = {
     return response.data;
   },
 
+  // Streams model output via onToken(text); resolves with the saved RFP
+  createFromTextStream: async (text, onToken) =>
+    streamEvents('/rfps/from-text/stream', { method: 'POST', body: { text } }, (event, data) => {
+      if (event === 'token') onToken(data.text);
+    }),
+
   create: async (rfp) => {
     const response = await client.post('/rfps', rfp);
     return response.data;
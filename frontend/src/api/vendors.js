@@ -1,10 +1,9 @@
-import client from './client';
+import client, { fetchPage, fetchAllPages } from './client';
 
 export const vendorsApi = {
-  getAll: async () => {
-    const response = await client.get('/vendors');
-    return response.data;
-  },
+  getAll: async (params = {}) => fetchAllPages('/vendors', params),
+
+  getPage: async (params = {}) => fetchPage('/vendors', params),
 
   getById: async (id) => {
     const response = await client.get(`/vendors/${id}`);
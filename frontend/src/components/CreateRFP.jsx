@@ -22,6 +22,9 @@ const CreateRFP = () => {
   // Holds chat message history (user + assistant)
   const [messages, setMessages] = useState([]);
 
+  // Model output streamed so far for the pending request
+  const [streamedText, setStreamedText] = useState('');
+
   const navigate = useNavigate();
 
   // Handles sending natural-language text to the backend AI parser
@@ -36,10 +39,14 @@ const CreateRFP = () => {
     setText('');
     setLoading(true);
     setError(null);
+    setStreamedText('');
 
     try {
-      // Call backend to generate structured RFP using AI
-      const rfp = await rfpsApi.createFromText(userMessage);
+      // Call backend to generate structured RFP using AI, showing the
+      // model output as it streams in
+      const rfp = await rfpsApi.createFromTextStream(userMessage, (token) =>
+        setStreamedText((prev) => prev + token)
+      );
 
       // Add AI assistant message showing extracted RFP summary
       setMessages((prev) => [
@@ -65,9 +72,7 @@ const CreateRFP = () => {
 
     } catch (err) {
       // Extract error message if available
-      setError(
-        err?.response?.data?.detail || 'Failed to create RFP. Please try again.'
-      );
+      setError(err?.message || 'Failed to create RFP. Please try again.');
 
       // Add assistant error message to chat
       setMessages((prev) => [
@@ -135,6 +140,9 @@ const CreateRFP = () => {
           {loading && (
             <div className="chat-message assistant">
               <p>Processing your request...</p>
+              {streamedText && (
+                <pre style={{ whiteSpace: 'pre-wrap' }}>{streamedText}</pre>
+              )}
             </div>
           )}
         </div>
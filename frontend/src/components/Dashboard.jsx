@@ -12,11 +12,13 @@ import { proposalsApi } from '../api/proposals';
 import './Dashboard.css';
 
 const Dashboard = () => {
-  // Lists of data pulled from backend
+  // Recent items pulled from backend
   const [rfps, setRfps] = useState([]);
-  const [vendors, setVendors] = useState([]);
   const [proposals, setProposals] = useState([]);
 
+  // Total counts shown in the stat cards
+  const [totals, setTotals] = useState({ rfps: 0, activeRfps: 0, vendors: 0, proposals: 0 });
+
   // Loading state before data becomes available
   const [loading, setLoading] = useState(true);
 
@@ -25,20 +27,27 @@ const Dashboard = () => {
     loadData();
   }, []);
 
-  // Loads RFPs, vendors, and proposals in parallel
+  // Loads recent RFPs/proposals and counts in parallel
   const loadData = async () => {
     try {
-      // Fetch all required resources concurrently
-      const [rfpsData, vendorsData, proposalsData] = await Promise.all([
-        rfpsApi.getAll(),
-        vendorsApi.getAll(),
-        proposalsApi.getAll(),
+      // Fetch only the first page of each list; totals come from the
+      // X-Total-Count header, so nothing else needs to be loaded
+      const [rfpsPage, activeRfpsPage, vendorsPage, proposalsPage] = await Promise.all([
+        rfpsApi.getPage({ limit: 5 }),
+        rfpsApi.getPage({ status: 'sent', limit: 1 }),
+        vendorsApi.getPage({ limit: 1 }),
+        proposalsApi.getPage({ limit: 5, sort: '-created_at' }),
       ]);
 
       // Store in state
-      setRfps(rfpsData);
-      setVendors(vendorsData);
-      setProposals(proposalsData);
+      setRfps(rfpsPage.items);
+      setProposals(proposalsPage.items);
+      setTotals({
+        rfps: rfpsPage.total,
+        activeRfps: activeRfpsPage.total,
+        vendors: vendorsPage.total,
+        proposals: proposalsPage.total,
+      });
 
     } catch (error) {
       console.error('Failed to load dashboard data:', error);
@@ -65,24 +74,22 @@ const Dashboard = () => {
       <div className="stats-grid">
         <div className="stat-card">
           <h3>Total RFPs</h3>
-          <p className="stat-number">{rfps.length}</p>
+          <p className="stat-number">{totals.rfps}</p>
         </div>
 
         <div className="stat-card">
           <h3>Total Vendors</h3>
-          <p className="stat-number">{vendors.length}</p>
+          <p className="stat-number">{totals.vendors}</p>
         </div>
 
         <div className="stat-card">
           <h3>Total Proposals</h3>
-          <p className="stat-number">{proposals.length}</p>
+          <p className="stat-number">{totals.proposals}</p>
         </div>
 
         <div className="stat-card">
           <h3>Active RFPs</h3>
-          <p className="stat-number">
-            {rfps.filter((r) => r.status === 'sent').length}
-          </p>
+          <p className="stat-number">{totals.activeRfps}</p>
         </div>
       </div>
 
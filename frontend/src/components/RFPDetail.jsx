@@ -24,6 +24,8 @@ const RFPDetail = () => {
   // AI comparison result
   const [comparison, setComparison] = useState(null);
   const [showComparison, setShowComparison] = useState(false);
+  const [includeNarrative, setIncludeNarrative] = useState(false);
+  const [narrativeText, setNarrativeText] = useState('');
 
   // Vendor selection for sending RFP
   const [selectedVendors, setSelectedVendors] = useState([]);
@@ -78,13 +80,13 @@ const RFPDetail = () => {
     setSuccess(null);
 
     try {
-      // Call backend email API
-      await emailApi.sendRFP({
+      // Call backend email API (emails are queued and delivered in the background)
+      const job = await emailApi.sendRFP({
         rfp_id: Number(id),
         vendor_ids: selectedVendors,
       });
 
-      setSuccess(`RFP sent successfully to ${selectedVendors.length} vendor(s)`);
+      setSuccess(`RFP queued for sending to ${job.queued} vendor(s)`);
       setSelectedVendors([]);  // Reset selection
       await loadData();        // Refresh RFP status after sending
     } catch (err) {
@@ -105,16 +107,30 @@ const RFPDetail = () => {
 
     setLoadingComparison(true);
     setError(null);
+    setNarrativeText('');
 
     try {
-      // Request AI-driven comparison from backend
-      const result = await proposalsApi.compare(Number(id));
-      setComparison(result);
+      if (includeNarrative) {
+        // Show the locally computed scores right away, then stream the AI narrative
+        const result = await proposalsApi.compareStream(Number(id), {}, (event, data) => {
+          if (event === 'scores') {
+            setComparison(data);
+            setShowComparison(true);
+          }
+          if (event === 'token') setNarrativeText((prev) => prev + data.text);
+        });
+        setComparison(result);
+      } else {
+        // Request the scored comparison from backend
+        const result = await proposalsApi.compare(Number(id));
+        setComparison(result);
+      }
       setShowComparison(true);
     } catch (err) {
-      setError(err?.response?.data?.detail || 'Failed to compare proposals');
+      setError(err?.response?.data?.detail || err?.message || 'Failed to compare proposals');
     } finally {
       setLoadingComparison(false);
+      setNarrativeText('');
     }
   };
 
@@ -309,20 +325,35 @@ const RFPDetail = () => {
             <h2>Proposals ({proposals.length})</h2>
 
             {proposals.length >= 2 && (
-              <button
-                onClick={handleCompare}
-                className="btn btn-primary"
-                disabled={loadingComparison}
-              >
-                {loadingComparison ? 'Comparing...' : 'Compare & Get Recommendation'}
-              </button>
+              <div style={{ display: 'flex', alignItems: 'center', gap: '1rem' }}>
+                <label>
+                  <input
+                    type="checkbox"
+                    checked={includeNarrative}
+                    onChange={(e) => setIncludeNarrative(e.target.checked)}
+                  />{' '}
+                  Include AI narrative
+                </label>
+                <button
+                  onClick={handleCompare}
+                  className="btn btn-primary"
+                  disabled={loadingComparison}
+                >
+                  {loadingComparison ? 'Comparing...' : 'Compare & Get Recommendation'}
+                </button>
+              </div>
             )}
           </div>
 
           {/* AI COMPARISON RESULTS */}
           {showComparison && comparison && (
             <div className="comparison-section">
-              <h3>AI Recommendation</h3>
+              <h3>Recommendation</h3>
+
+              {/* AI narrative as it is being written */}
+              {loadingComparison && narrativeText && (
+                <p className="loading">Writing AI narrative... ({narrativeText.length} characters)</p>
+              )}
 
               <div className="recommendation-card">
                 <h4>